@@ -1,18 +1,35 @@
 import asyncio
+import csv
+import html
+import io
 import logging
+import os
 from aiogram import Bot, Dispatcher, F
-from aiogram.filters import CommandStart
-from aiogram.types import Message, CallbackQuery
+from aiogram.filters import CommandStart, Command, CommandObject
+from aiogram.types import Message, CallbackQuery, FSInputFile, BufferedInputFile
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.storage.memory import MemoryStorage
 
-from config import ADMIN_BOT_TOKEN, ADMIN_ID, USER_BOT_TOKEN
-from database import Database
+from config import (
+    ADMIN_BOT_TOKEN, ADMIN_ID, USER_BOT_TOKEN, PAGE_SIZE,
+    BULK_CHANNELS_LIMIT, BULK_VERIFY_CONCURRENCY,
+    SCHEDULER_MAX_CONCURRENCY, SCHEDULER_MAX_QUEUE, SCHEDULER_SHED_TIMEOUT
+)
+from database import Database, EXPORT_TABLES
+from maintenance import maintenance_worker
+from health import channel_health_worker
+from export import export_table, EXPORT_FORMATS
+from download_tokens import encode_download_token
+from middlewares import SchedulerMiddleware
+from http_session import get_session, close_session
+from recording import setup_recording
+from tracing import TracingMiddleware, TracingRequestMiddleware, setup_tracing, shutdown_tracing
 from keyboards import (
     get_admin_main_menu, get_bot_management_menu,
     get_channel_management_menu, get_bots_list,
-    get_channels_list, get_channel_actions, get_cancel_button
+    get_channels_list, get_channel_actions, get_cancel_button,
+    get_export_menu, get_download_button
 )
 
 # Logging
@@ -20,12 +37,26 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Bot va dispatcher
-bot = Bot(token=ADMIN_BOT_TOKEN)
-user_bot = Bot(token=USER_BOT_TOKEN)
+# Barcha Bot obyektlari bitta HTTP sessiyadan foydalanadi
+bot = Bot(token=ADMIN_BOT_TOKEN, session=get_session())
+user_bot = Bot(token=USER_BOT_TOKEN, session=get_session())
 storage = MemoryStorage()
 dp = Dispatcher(storage=storage)
+recorder = setup_recording(dp, "admin")
+dp.update.outer_middleware(TracingMiddleware())
+bot.session.middleware(TracingRequestMiddleware())
+dp.update.outer_middleware(SchedulerMiddleware(
+    SCHEDULER_MAX_CONCURRENCY, SCHEDULER_MAX_QUEUE, SCHEDULER_SHED_TIMEOUT
+))
 db = Database("bot_database.db")
 
+# Bot API orqali yuboriladigan fayl hajmi chegarasi
+MAX_UPLOAD_SIZE = 50 * 1024 * 1024
+
+# Bir vaqtda bitta eksport; fon vazifalariga havola (GC yig'ib olmasligi uchun)
+export_lock = asyncio.Lock()
+background_tasks = set()
+
 # FSM States
 class BotStates(StatesGroup):
     waiting_bot_token = State()
@@ -33,6 +64,7 @@ class BotStates(StatesGroup):
 
 class ChannelStates(StatesGroup):
     waiting_channel_id = State()
+    waiting_bulk_channels = State()
     selected_bot_id = State()
 
 def is_admin(user_id: int) -> bool:
@@ -71,8 +103,8 @@ async def channels_menu_handler(message: Message):
     if not is_admin(message.from_user.id):
         return
     
-    bots = await db.get_all_bots()
-    if not bots:
+    page = await db.get_bots_page(limit=PAGE_SIZE)
+    if not page['items']:
         await message.answer(
             "❌ Avval bot qo'shishingiz kerak!\n\n"
             "🤖 Botlar → ➕ Yangi bot qo'shish"
@@ -82,7 +114,7 @@ async def channels_menu_handler(message: Message):
     await message.answer(
         "📢 <b>Kanallar boshqaruvi</b>\n\n"
         "Qaysi botga kanal qo'shmoqchisiz?",
-        reply_markup=get_bots_list(bots),
+        reply_markup=get_bots_list(page['items'], page['has_prev'], page['has_next']),
         parse_mode="HTML"
     )
 
@@ -101,13 +133,74 @@ async def stats_handler(message: Message):
     text += f"🤖 Botlar soni: {len(bots)}\n\n"
     
     for bot_data in bots:
-        bot_stats = await db.get_stats(bot_data['id'])
-        text += f"<b>{bot_data['name']}</b>\n"
+        bot_stats = await db.get_stats(bot_data.id)
+        text += f"<b>{bot_data.name}</b>\n"
         text += f"  📢 Kanallar: {bot_stats.get('channels', 0)}\n"
         text += f"  📁 Fayllar: {bot_stats.get('files', 0)}\n\n"
     
     await message.answer(text, parse_mode="HTML")
 
+@dp.message(F.text == "📤 Eksport")
+@dp.message(Command("export"))
+async def export_menu_handler(message: Message):
+    """Eksport menyusi"""
+    if not is_admin(message.from_user.id):
+        return
+    
+    await message.answer(
+        "📤 <b>Ma'lumotlarni eksport qilish</b>\n\n"
+        "Fayl gzip siqilgan holda yuboriladi.",
+        reply_markup=get_export_menu(),
+        parse_mode="HTML"
+    )
+
+async def run_export(chat_id: int, table: str, fmt: str):
+    """Eksportni fonda bajarish va hujjat sifatida yuborish"""
+    async with export_lock:
+        path = None
+        try:
+            path, count = await export_table(db, table, fmt)
+            size = os.path.getsize(path)
+            if size > MAX_UPLOAD_SIZE:
+                await bot.send_message(
+                    chat_id,
+                    f"❌ Fayl juda katta ({size // (1024 * 1024)} MB), Telegram orqali yuborib bo'lmaydi."
+                )
+                return
+            
+            await bot.send_document(
+                chat_id,
+                FSInputFile(path, filename=f"{table}.{fmt}.gz"),
+                caption=f"✅ {table}: {count} ta qator"
+            )
+        except Exception as e:
+            logger.error(f"Eksportda xato: {e}")
+            await bot.send_message(chat_id, f"❌ Eksportda xatolik: {str(e)}")
+        finally:
+            if path and os.path.exists(path):
+                os.remove(path)
+
+@dp.callback_query(F.data.startswith("export_"))
+async def export_handler(callback: CallbackQuery):
+    """Eksportni boshlash"""
+    if not is_admin(callback.from_user.id):
+        return
+    
+    _, table, fmt = callback.data.split("_")
+    if table not in EXPORT_TABLES or fmt not in EXPORT_FORMATS:
+        await callback.answer("❌ Noma'lum eksport turi!", show_alert=True)
+        return
+    
+    if export_lock.locked():
+        await callback.answer("⏳ Boshqa eksport bajarilmoqda, biroz kuting.", show_alert=True)
+        return
+    
+    task = asyncio.create_task(run_export(callback.from_user.id, table, fmt))
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    
+    await callback.answer("⏳ Eksport tayyorlanmoqda...")
+
 @dp.message(F.text == "ℹ️ Yordam")
 async def help_handler(message: Message):
     """Yordam"""
@@ -127,14 +220,20 @@ async def help_handler(message: Message):
 📢 Kanallar → Botni tanlang → ➕ Kanal qo'shish
 - Kanal ID yoki @username kiriting
 - Bot kanalda admin bo'lishi SHART!
+- 📥 Ko'plab kanal qo'shish: ro'yxatni bitta xabarda yuboring
 
 <b>3. Fayl yuklash:</b>
 User botingizga fayl yuboring
 Fayl avtomatik bazaga saqlanadi
 
 <b>4. Kanalingizda post:</b>
-Post qiling va fayl ostida inline button qo'ying:
-⬇️ Yuklab olish → Callback data: download_FILE_ID
+/button FILE_ID → imzolangan "⬇️ Yuklab olish" tugmasi va uning callback data si
+Post qiling va fayl ostiga shu callback data bilan inline button qo'ying
+/buttons [BOT_ID] → barcha fayllar uchun eski va yangi callback data (CSV)
+
+<b>5. Eksport:</b>
+📤 Eksport yoki /export → jadval va formatni tanlang
+Foydalanuvchilar/yuklab olishlar CSV yoki JSONL (gzip) faylda yuboriladi
 
 <b>Qo'llab-quvvatlash:</b>
 @yoursupport
@@ -142,6 +241,75 @@ Post qiling va fayl ostida inline button qo'ying:
     
     await message.answer(text, parse_mode="HTML")
 
+@dp.message(Command("button"))
+async def download_button_handler(message: Message, command: CommandObject):
+    """Fayl uchun imzolangan yuklab olish tugmasi"""
+    if not is_admin(message.from_user.id):
+        return
+    
+    args = command.args.strip() if command.args else ""
+    if not (args.isascii() and args.isdigit()):
+        await message.answer("❌ Foydalanish: /button FILE_ID")
+        return
+    
+    file_data = await db.get_file(int(args))
+    if not file_data:
+        await message.answer("❌ Fayl topilmadi!")
+        return
+    
+    try:
+        markup = get_download_button(file_data)
+    except ValueError as e:
+        await message.answer(f"❌ Tugma yaratib bo'lmadi: {e}")
+        return
+    
+    await message.answer(
+        f"📎 <b>{html.escape(file_data.file_name or file_data.file_id)}</b> ({html.escape(file_data.file_type)})\n\n"
+        f"Callback data:\n<code>{markup.inline_keyboard[0][0].callback_data}</code>",
+        reply_markup=markup,
+        parse_mode="HTML"
+    )
+
+@dp.message(Command("buttons"))
+async def download_buttons_handler(message: Message, command: CommandObject):
+    """Kanal postlarini yangilash uchun: eski download_<id> -> imzolangan callback data"""
+    if not is_admin(message.from_user.id):
+        return
+    
+    args = command.args.strip() if command.args else ""
+    if args and not (args.isascii() and args.isdigit()):
+        await message.answer("❌ Foydalanish: /buttons [BOT_ID]")
+        return
+    
+    files = await db.get_files(int(args) if args else None)
+    if not files:
+        await message.answer("❌ Fayllar topilmadi!")
+        return
+    
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["id", "bot_id", "file_type", "file_name", "old_callback_data", "callback_data", "error"])
+    failed = 0
+    for file in files:
+        # Noto'g'ri media turli qator butun ro'yxatni to'xtatmasin - belgilab o'tamiz
+        try:
+            token, error = encode_download_token(file.id, file.bot_id, file.file_type), ""
+        except ValueError as e:
+            token, error = "", str(e)
+            failed += 1
+        writer.writerow([
+            file.id, file.bot_id, file.file_type, file.file_name or "",
+            f"download_{file.id}", token, error
+        ])
+    
+    caption = f"🔁 {len(files)} ta fayl: postlardagi old_callback_data ni callback_data ga almashtiring"
+    if failed:
+        caption += f"\n⚠️ {failed} ta faylga tugma yaratilmadi (error ustuniga qarang)"
+    await message.answer_document(
+        BufferedInputFile(buffer.getvalue().encode(), filename="download_buttons.csv"),
+        caption=caption
+    )
+
 # ===== BOT QO'SHISH =====
 @dp.callback_query(F.data == "add_bot")
 async def add_bot_start(callback: CallbackQuery, state: FSMContext):
@@ -176,9 +344,8 @@ async def add_bot_token(message: Message, state: FSMContext):
     
     # Tokenni tekshirish
     try:
-        test_bot = Bot(token=token)
+        test_bot = Bot(token=token, session=get_session())
         bot_info = await test_bot.get_me()
-        await test_bot.session.close()
         
         await state.update_data(token=token, bot_username=bot_info.username)
         await message.answer(
@@ -226,19 +393,40 @@ async def list_bots_handler(callback: CallbackQuery):
     if not is_admin(callback.from_user.id):
         return
     
-    bots = await db.get_all_bots()
-    if not bots:
+    page = await db.get_bots_page(limit=PAGE_SIZE)
+    if not page['items']:
         await callback.answer("❌ Hali botlar qo'shilmagan!", show_alert=True)
         return
     
+    await show_bots_page(callback, page)
+
+async def show_bots_page(callback: CallbackQuery, page: dict):
+    """Botlar sahifasini ko'rsatish"""
     await callback.message.edit_text(
         "🤖 <b>Botlar ro'yxati:</b>\n\n"
+        f"Jami: {page['total']} ta bot\n"
         "Batafsil ma'lumot olish uchun botni tanlang:",
-        reply_markup=get_bots_list(bots),
+        reply_markup=get_bots_list(page['items'], page['has_prev'], page['has_next']),
         parse_mode="HTML"
     )
     await callback.answer()
 
+@dp.callback_query(F.data.startswith("bpage_"))
+async def bots_page_handler(callback: CallbackQuery):
+    """Botlar ro'yxati: keyingi/oldingi sahifa"""
+    if not is_admin(callback.from_user.id):
+        return
+    
+    _, direction, cursor_id = callback.data.split("_")
+    page = await db.get_bots_page(
+        int(cursor_id), "next" if direction == "n" else "prev", PAGE_SIZE
+    )
+    if not page['items']:
+        # Kursor elementi o'chirilgan bo'lishi mumkin - birinchi sahifaga qaytamiz
+        page = await db.get_bots_page(limit=PAGE_SIZE)
+    
+    await show_bots_page(callback, page)
+
 @dp.callback_query(F.data.startswith("bot_"))
 async def bot_detail_handler(callback: CallbackQuery):
     """Bot tafsilotlari"""
@@ -246,19 +434,17 @@ async def bot_detail_handler(callback: CallbackQuery):
         return
     
     bot_id = int(callback.data.split("_")[1])
-    bots = await db.get_all_bots()
-    bot_data = next((b for b in bots if b['id'] == bot_id), None)
+    bot_data = await db.get_bot(bot_id)
     
     if not bot_data:
         await callback.answer("❌ Bot topilmadi!", show_alert=True)
         return
     
     stats = await db.get_stats(bot_id)
-    channels = await db.get_channels(bot_id)
     
-    text = f"🤖 <b>{bot_data['name']}</b>\n\n"
+    text = f"🤖 <b>{bot_data.name}</b>\n\n"
     text += f"🆔 ID: {bot_id}\n"
-    text += f"📢 Kanallar: {len(channels)}\n"
+    text += f"📢 Kanallar: {stats.get('channels', 0)}\n"
     text += f"📁 Fayllar: {stats.get('files', 0)}\n"
     
     await callback.message.edit_text(
@@ -291,6 +477,43 @@ async def add_channel_start(callback: CallbackQuery, state: FSMContext):
     )
     await callback.answer()
 
+async def verify_channel(channel_input: str) -> dict:
+    """
+    Kanalni tekshirish va DB uchun ma'lumot tayyorlash
+    Bot admin bo'lmasa ValueError, kanal topilmasa Telegram xatosi ko'tariladi.
+    """
+    # Kanalga kirish va ma'lumot olish
+    chat = await user_bot.get_chat(channel_input)
+    
+    # Bot admin ekanligini tekshirish
+    bot_member = await user_bot.get_chat_member(chat.id, user_bot.id)
+    if bot_member.status not in ['administrator', 'creator']:
+        raise ValueError("Bot bu kanalda admin emas")
+    
+    # Kanal turini aniqlash
+    channel_type = "private" if chat.type == "channel" and chat.username is None else "public"
+    
+    # Invite link olish (agar private bo'lsa)
+    # So'rov bilan qo'shiladigan link: user bot chat_join_request ni oladi va tasdiqlaydi
+    invite_link = None
+    if channel_type == "private":
+        try:
+            link = await user_bot.create_chat_invite_link(chat.id, creates_join_request=True)
+            invite_link = link.invite_link
+        except:
+            try:
+                invite_link = await user_bot.export_chat_invite_link(chat.id)
+            except:
+                pass
+    
+    return {
+        'channel_id': str(chat.id),
+        'username': chat.username,
+        'title': chat.title,
+        'channel_type': channel_type,
+        'invite_link': invite_link,
+    }
+
 @dp.message(ChannelStates.waiting_channel_id)
 async def add_channel_id(message: Message, state: FSMContext):
     """Kanal ID qabul qilish"""
@@ -299,56 +522,13 @@ async def add_channel_id(message: Message, state: FSMContext):
     bot_id = data['bot_id']
     
     try:
-        # Kanalga kirish va ma'lumot olish
-        chat = await user_bot.get_chat(channel_input)
-        
-        # Bot admin ekanligini tekshirish
-        bot_member = await user_bot.get_chat_member(chat.id, user_bot.id)
-        if bot_member.status not in ['administrator', 'creator']:
-            await message.answer(
-                "❌ Bot bu kanalda admin emas!\n\n"
-                "Iltimos botni kanalga admin qilib qo'shing va qaytadan urinib ko'ring."
-            )
-            return
-        
-        # Kanal turini aniqlash
-        channel_type = "private" if chat.type == "channel" and chat.username is None else "public"
-        
-        # Invite link olish (agar private bo'lsa)
-        invite_link = None
-        if channel_type == "private":
-            try:
-                link = await user_bot.export_chat_invite_link(chat.id)
-                invite_link = link
-            except:
-                pass
-        
-        # Bazaga qo'shish
-        success = await db.add_channel(
-            bot_id=bot_id,
-            channel_id=str(chat.id),
-            username=chat.username,
-            title=chat.title,
-            channel_type=channel_type,
-            invite_link=invite_link
+        channel = await verify_channel(channel_input)
+    except ValueError:
+        await message.answer(
+            "❌ Bot bu kanalda admin emas!\n\n"
+            "Iltimos botni kanalga admin qilib qo'shing va qaytadan urinib ko'ring."
         )
-        
-        if success:
-            type_emoji = "🔒" if channel_type == "private" else "📢"
-            await message.answer(
-                f"✅ <b>Kanal muvaffaqiyatli qo'shildi!</b>\n\n"
-                f"{type_emoji} {chat.title}\n"
-                f"🆔 ID: {chat.id}\n"
-                f"🔗 Username: @{chat.username or 'Private'}\n"
-                f"📝 Turi: {channel_type.title()}",
-                reply_markup=get_admin_main_menu(),
-                parse_mode="HTML"
-            )
-        else:
-            await message.answer("❌ Bu kanal allaqachon qo'shilgan!")
-        
-        await state.clear()
-        
+        return
     except Exception as e:
         logger.error(f"Kanal qo'shishda xato: {e}")
         await message.answer(
@@ -359,6 +539,99 @@ async def add_channel_id(message: Message, state: FSMContext):
             f"• Bot kanalda adminmi?\n"
             f"• Bot kanalga kirish huquqiga egami?"
         )
+        return
+    
+    # Bazaga qo'shish
+    success = await db.add_channel(bot_id=bot_id, **channel)
+    
+    if success:
+        type_emoji = "🔒" if channel['channel_type'] == "private" else "📢"
+        await message.answer(
+            f"✅ <b>Kanal muvaffaqiyatli qo'shildi!</b>\n\n"
+            f"{type_emoji} {channel['title']}\n"
+            f"🆔 ID: {channel['channel_id']}\n"
+            f"🔗 Username: @{channel['username'] or 'Private'}\n"
+            f"📝 Turi: {channel['channel_type'].title()}",
+            reply_markup=get_admin_main_menu(),
+            parse_mode="HTML"
+        )
+    else:
+        await message.answer("❌ Bu kanal allaqachon qo'shilgan!")
+    
+    await state.clear()
+
+@dp.callback_query(F.data.startswith("bulk_channels_"))
+async def bulk_channels_start(callback: CallbackQuery, state: FSMContext):
+    """Ko'plab kanal qo'shish boshlash"""
+    if not is_admin(callback.from_user.id):
+        return
+    
+    bot_id = int(callback.data.split("_")[2])
+    
+    await state.update_data(bot_id=bot_id)
+    await state.set_state(ChannelStates.waiting_bulk_channels)
+    
+    await callback.message.answer(
+        "📥 <b>Ko'plab kanal qo'shish</b>\n\n"
+        f"Kanal ID yoki @username larni yuboring (har qatorda bittadan, "
+        f"bo'sh joy yoki vergul bilan ajratish ham mumkin, ko'pi bilan {BULK_CHANNELS_LIMIT} ta):\n\n"
+        "<code>@kanal1\n@kanal2\n-1001234567890</code>\n\n"
+        "⚠️ Bot barcha kanallarda admin bo'lishi SHART!",
+        reply_markup=get_cancel_button(),
+        parse_mode="HTML"
+    )
+    await callback.answer()
+
+@dp.message(ChannelStates.waiting_bulk_channels)
+async def add_bulk_channels(message: Message, state: FSMContext):
+    """Kanallar ro'yxatini parallel tekshirish va bitta tranzaksiyada qo'shish"""
+    # Tartibni saqlagan holda takrorlarni olib tashlash
+    inputs = list(dict.fromkeys(message.text.replace(",", " ").split()))
+    if not inputs:
+        await message.answer("❌ Ro'yxat bo'sh!")
+        return
+    if len(inputs) > BULK_CHANNELS_LIMIT:
+        await message.answer(f"❌ Juda ko'p kanal! Ko'pi bilan {BULK_CHANNELS_LIMIT} ta.")
+        return
+    
+    data = await state.get_data()
+    bot_id = data['bot_id']
+    await state.clear()
+    
+    progress = await message.answer(f"⏳ {len(inputs)} ta kanal tekshirilmoqda...")
+    
+    semaphore = asyncio.Semaphore(BULK_VERIFY_CONCURRENCY)
+    
+    async def verify(channel_input: str):
+        async with semaphore:
+            try:
+                return await verify_channel(channel_input)
+            except Exception as e:
+                return e
+    
+    results = await asyncio.gather(*(verify(ch) for ch in inputs))
+    
+    valid = [r for r in results if isinstance(r, dict)]
+    inserted = await db.add_channels(bot_id, valid)
+    inserted_iter = iter(inserted)
+    
+    lines = []
+    added = 0
+    for channel_input, result in zip(inputs, results):
+        if isinstance(result, Exception):
+            lines.append(f"❌ {channel_input} — {result}")
+        elif next(inserted_iter):
+            added += 1
+            type_emoji = "🔒" if result['channel_type'] == "private" else "📢"
+            lines.append(f"✅ {type_emoji} {result['title']} ({result['channel_id']})")
+        else:
+            lines.append(f"⚠️ {result['title']} — allaqachon qo'shilgan")
+    
+    report = f"📥 Natija: {added}/{len(inputs)} ta kanal qo'shildi\n\n" + "\n".join(lines)
+    await progress.delete()
+    # Telegram xabar chegarasi (4096) - bo'laklab yuborish
+    for i in range(0, len(report), 4000):
+        await message.answer(report[i:i + 4000], reply_markup=get_admin_main_menu())
 
 @dp.callback_query(F.data.startswith("list_channels_"))
 async def list_channels_handler(callback: CallbackQuery):
@@ -367,20 +640,43 @@ async def list_channels_handler(callback: CallbackQuery):
         return
     
     bot_id = int(callback.data.split("_")[2])
-    channels = await db.get_channels(bot_id)
+    page = await db.get_channels_page(bot_id, limit=PAGE_SIZE)
     
-    if not channels:
+    if not page['items']:
         await callback.answer("❌ Bu botga hali kanallar qo'shilmagan!", show_alert=True)
         return
     
+    await show_channels_page(callback, page, bot_id)
+
+async def show_channels_page(callback: CallbackQuery, page: dict, bot_id: int):
+    """Kanallar sahifasini ko'rsatish"""
     await callback.message.edit_text(
         f"📢 <b>Kanallar ro'yxati</b>\n\n"
-        f"Jami: {len(channels)} ta kanal",
-        reply_markup=get_channels_list(channels, bot_id),
+        f"Jami: {page['total']} ta kanal",
+        reply_markup=get_channels_list(page['items'], bot_id, page['has_prev'], page['has_next']),
         parse_mode="HTML"
     )
     await callback.answer()
 
+@dp.callback_query(F.data.startswith("cpage_"))
+async def channels_page_handler(callback: CallbackQuery):
+    """Kanallar ro'yxati: keyingi/oldingi sahifa"""
+    if not is_admin(callback.from_user.id):
+        return
+    
+    _, bot_id, direction, cursor_id = callback.data.split("_")
+    bot_id = int(bot_id)
+    page = await db.get_channels_page(
+        bot_id, int(cursor_id), "next" if direction == "n" else "prev", PAGE_SIZE
+    )
+    if not page['items']:
+        page = await db.get_channels_page(bot_id, limit=PAGE_SIZE)
+        if not page['items']:
+            await callback.answer("❌ Bu botga hali kanallar qo'shilmagan!", show_alert=True)
+            return
+    
+    await show_channels_page(callback, page, bot_id)
+
 @dp.callback_query(F.data.startswith("channel_"))
 async def channel_detail_handler(callback: CallbackQuery):
     """Kanal tafsilotlari"""
@@ -389,30 +685,22 @@ async def channel_detail_handler(callback: CallbackQuery):
     
     channel_db_id = int(callback.data.split("_")[1])
     
-    # Kanalni topish (barcha botlardan)
-    all_bots = await db.get_all_bots()
-    channel = None
-    bot_id = None
-    
-    for bot_data in all_bots:
-        channels = await db.get_channels(bot_data['id'])
-        for ch in channels:
-            if ch['id'] == channel_db_id:
-                channel = ch
-                bot_id = bot_data['id']
-                break
-        if channel:
-            break
+    # Kanalni topish
+    channel = await db.get_channel_by_id(channel_db_id)
     
     if not channel:
         await callback.answer("❌ Kanal topilmadi!", show_alert=True)
         return
     
-    type_emoji = "🔒" if channel['type'] == "private" else "📢"
-    text = f"{type_emoji} <b>{channel['title']}</b>\n\n"
-    text += f"🆔 ID: {channel['channel_id']}\n"
-    text += f"🔗 Username: @{channel['username'] or 'Private'}\n"
-    text += f"📝 Turi: {channel['type'].title()}\n"
+    bot_id = channel.bot_id
+    
+    type_emoji = "🔒" if channel.type == "private" else "📢"
+    text = f"{type_emoji} <b>{channel.title}</b>\n\n"
+    text += f"🆔 ID: {channel.channel_id}\n"
+    text += f"🔗 Username: @{channel.username or 'Private'}\n"
+    text += f"📝 Turi: {channel.type.title()}\n"
+    if channel.quarantined:
+        text += f"\n⛔ Karantinda: {channel.quarantine_reason}\n"
     
     await callback.message.edit_text(
         text,
@@ -430,35 +718,25 @@ async def delete_channel_handler(callback: CallbackQuery):
     channel_db_id = int(callback.data.split("_")[2])
     
     # Kanalni topish
-    all_bots = await db.get_all_bots()
-    channel = None
-    bot_id = None
-    
-    for bot_data in all_bots:
-        channels = await db.get_channels(bot_data['id'])
-        for ch in channels:
-            if ch['id'] == channel_db_id:
-                channel = ch
-                bot_id = bot_data['id']
-                break
-        if channel:
-            break
+    channel = await db.get_channel_by_id(channel_db_id)
     
     if not channel:
         await callback.answer("❌ Kanal topilmadi!", show_alert=True)
         return
     
+    bot_id = channel.bot_id
+    
     # O'chirish
-    success = await db.remove_channel(bot_id, channel['channel_id'])
+    success = await db.remove_channel(bot_id, channel.channel_id)
     
     if success:
         await callback.answer("✅ Kanal o'chirildi!", show_alert=True)
-        # Kanallar ro'yxatiga qaytish
-        channels = await db.get_channels(bot_id)
-        if channels:
+        # Kanallar ro'yxatiga qaytish (birinchi sahifa)
+        page = await db.get_channels_page(bot_id, limit=PAGE_SIZE)
+        if page['items']:
             await callback.message.edit_text(
-                f"📢 <b>Kanallar ro'yxati</b>\n\nJami: {len(channels)} ta kanal",
-                reply_markup=get_channels_list(channels, bot_id),
+                f"📢 <b>Kanallar ro'yxati</b>\n\nJami: {page['total']} ta kanal",
+                reply_markup=get_channels_list(page['items'], bot_id, page['has_prev'], page['has_next']),
                 parse_mode="HTML"
             )
         else:
@@ -500,14 +778,35 @@ async def bots_menu_callback(callback: CallbackQuery):
     )
     await callback.answer()
 
+async def notify_admin(text: str):
+    """Adminga xabar yuborish (fon vazifalari uchun)"""
+    try:
+        await bot.send_message(ADMIN_ID, text, parse_mode="HTML")
+    except Exception as e:
+        logger.error(f"Adminga xabar yuborishda xato: {e}")
+
 async def main():
     """Admin botni ishga tushirish"""
+    setup_tracing()
     await db.init_db()
     
     bot_info = await bot.get_me()
     logger.info(f"Admin bot ishga tushdi: @{bot_info.username}")
     
-    await dp.start_polling(bot)
+    # Yuklab olishlarni arxivlash va DB ni siqish (fonda)
+    maintenance_task = asyncio.create_task(maintenance_worker(db))
+    # Kanallar holati: bot admin bo'lmagan kanallarni karantinga olish
+    health_task = asyncio.create_task(channel_health_worker(db, user_bot, notify_admin))
+    
+    try:
+        await dp.start_polling(bot)
+    finally:
+        maintenance_task.cancel()
+        health_task.cancel()
+        await close_session()
+        shutdown_tracing()
+        if recorder:
+            recorder.stop()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
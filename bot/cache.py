@@ -0,0 +1,28 @@
+from collections import OrderedDict
+from typing import Any, Hashable
+
+class LRUCache:
+    """Hajmi cheklangan LRU kesh (eng kam ishlatilgan element chiqarib tashlanadi)"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            return default
+        return self._data[key]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        return self._data.pop(key, default)
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -13,6 +13,83 @@ ADMIN_ID = int(os.getenv("ADMIN_ID", 0))
 # Database
 DATABASE_NAME = os.getenv("DATABASE_NAME", "bot_database.db")
 
+# Qo'shilish so'rovlarini avtomatik tasdiqlash
+JOIN_APPROVE_BATCH_SIZE = int(os.getenv("JOIN_APPROVE_BATCH_SIZE", 100))
+JOIN_APPROVE_DELAY = float(os.getenv("JOIN_APPROVE_DELAY", 0.05))  # so'rovlar orasidagi pauza (s)
+JOIN_APPROVE_IDLE = float(os.getenv("JOIN_APPROVE_IDLE", 5))  # navbat bo'sh bo'lganda kutish (s)
+
+# Yuklab olishlarni arxivlash va texnik xizmat
+DOWNLOADS_RETENTION_DAYS = int(os.getenv("DOWNLOADS_RETENTION_DAYS", 90))
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", 2000))
+MAINTENANCE_INTERVAL = int(os.getenv("MAINTENANCE_INTERVAL", 3600))  # s
+VACUUM_PAGES_PER_STEP = int(os.getenv("VACUUM_PAGES_PER_STEP", 500))
+
+# Admin paneldagi ro'yxatlar sahifa hajmi
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", 10))
+
+# Update rejalashtiruvchi (middlewares.SchedulerMiddleware)
+SCHEDULER_MAX_CONCURRENCY = int(os.getenv("SCHEDULER_MAX_CONCURRENCY", 32))
+SCHEDULER_MAX_QUEUE = int(os.getenv("SCHEDULER_MAX_QUEUE", 1000))
+SCHEDULER_SHED_TIMEOUT = float(os.getenv("SCHEDULER_SHED_TIMEOUT", 10))  # /start uchun (s)
+SCHEDULER_METRICS_INTERVAL = int(os.getenv("SCHEDULER_METRICS_INTERVAL", 60))  # s
+
+# Bot API uchun umumiy HTTP sessiya (http_session.py)
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", 100))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", 100))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", 60))  # s
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", 300))  # s
+HTTP_REQUEST_TIMEOUT = float(os.getenv("HTTP_REQUEST_TIMEOUT", 60))  # s
+
+# Foydalanuvchi profili keshi (o'zgarmagan profil uchun DB ga yozilmaydi)
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 200000))
+
+# Tracing (tracing.py): 0 - o'chirilgan, 0.01 - update'larning 1% i
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", 0))
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", 10 * 1024 * 1024))
+TRACE_BACKUP_COUNT = int(os.getenv("TRACE_BACKUP_COUNT", 5))
+
+# Ko'plab kanal qo'shish
+BULK_CHANNELS_LIMIT = int(os.getenv("BULK_CHANNELS_LIMIT", 100))
+BULK_VERIFY_CONCURRENCY = int(os.getenv("BULK_VERIFY_CONCURRENCY", 5))
+
+# Kanal holati monitoringi (health.py)
+HEALTH_CHECK_INTERVAL = int(os.getenv("HEALTH_CHECK_INTERVAL", 300))  # s
+HEALTH_CHECK_CONCURRENCY = int(os.getenv("HEALTH_CHECK_CONCURRENCY", 10))
+
+# Update'larni yozib olish (recording.py) va qayta berish (replay.py)
+RECORD_UPDATES = os.getenv("RECORD_UPDATES", "0") == "1"
+RECORD_DIR = os.getenv("RECORD_DIR", "recordings")
+RECORD_MAX_BYTES = int(os.getenv("RECORD_MAX_BYTES", 50 * 1024 * 1024))
+RECORD_BACKUP_COUNT = int(os.getenv("RECORD_BACKUP_COUNT", 10))
+RECORD_SALT = os.getenv("RECORD_SALT", "")  # bo'sh bo'lsa - har ishga tushishda tasodifiy
+
+# Multi-process rejim (workers.py): update'lar user_id bo'yicha workerlarga taqsimlanadi
+WORKERS = int(os.getenv("WORKERS", os.cpu_count() or 1))
+WORKER_INDEX = os.getenv("WORKER_INDEX", "")  # workers.py o'zi o'rnatadi
+# Worker rejimida USER_CACHE_SIZE workerlar orasida bo'linadi: har bir worker
+# faqat o'ziga tushadigan (~1/N) foydalanuvchilarni saqlaydi
+if WORKER_INDEX and USER_CACHE_SIZE:
+    USER_CACHE_SIZE = max(1, USER_CACHE_SIZE // WORKERS)
+POLL_TIMEOUT = int(os.getenv("POLL_TIMEOUT", 30))  # s, getUpdates long polling
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")  # masalan https://example.com/webhook
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "127.0.0.1")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", 8080))
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+
+# A'zolik keshi (DB dagi umumiy jadval): tasdiqlangan obuna shuncha vaqt qayta tekshirilmaydi.
+# Standart holatda faqat workers.py rejimida yoqiladi (bitta jarayonda - har bosishda yozuv)
+MEMBERSHIP_CACHE_TTL = int(os.getenv("MEMBERSHIP_CACHE_TTL", 60 if WORKER_INDEX else 0))  # s, 0 - o'chirilgan
+
+# Yuklab olish tugmalari: HMAC imzoli callback tokenlar (download_tokens.py)
+# Bo'sh bo'lsa USER_BOT_TOKEN dan hosil qilinadi (token almashsa eski tugmalar ishlamaydi)
+CALLBACK_SECRET = os.getenv("CALLBACK_SECRET", "")
+# 1 - eski download_<id> tugmalarini ham qabul qilish (o'tish davri, standart).
+# Postlar /buttons ro'yxati bo'yicha yangilangach 0 qiling - eski ID lar sanab chiqilishi mumkin
+LEGACY_DOWNLOAD_IDS = os.getenv("LEGACY_DOWNLOAD_IDS", "1") == "1"
+
 # Xabar shablonlari
 MESSAGES = {
     "start": "👋 Assalomu alaykum!\n\nFayllarni yuklab olish uchun kanallarimizga obuna bo'ling.",
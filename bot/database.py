@@ -1,77 +1,39 @@
 import aiosqlite
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, AsyncIterator, Callable
 import json
+import time
 
+from migrations import migrate
+from cache import LRUCache
+from records import (
+    BotRecord, ChannelRecord, FileRecord, DownloadGate, ChannelGate,
+    BOT_COLUMNS, CHANNEL_COLUMNS, FILE_COLUMNS, record_factory
+)
+from tracing import trace_methods
+
+# Eksport qilinadigan jadvallar va ustunlar
+EXPORT_TABLES = {
+    "users": ("user_id", "username", "first_name", "last_name", "first_seen"),
+    "downloads": ("id", "user_id", "file_id", "downloaded_at"),
+}
+
+def profile_fingerprint(username: Optional[str], first_name: Optional[str],
+                        last_name: Optional[str]) -> int:
+    """Foydalanuvchi profili xeshi (faqat jarayon ichidagi kesh uchun)"""
+    return hash((username, first_name, last_name))
+
+@trace_methods("db")
 class Database:
-    def __init__(self, db_name: str):
+    def __init__(self, db_name: str, user_cache_size: int = 0, membership_ttl: int = 0):
         self.db_name = db_name
+        # memberships jadvalidagi tasdiqlangan obuna shuncha soniya amal qiladi (0 - o'chirilgan)
+        self.membership_ttl = membership_ttl
+        # user_id -> profil xeshi: o'zgarmagan profil uchun add_user yozmaydi
+        self.user_fingerprints = LRUCache(user_cache_size) if user_cache_size else None
     
     async def init_db(self):
-        """Database jadvallarini yaratish"""
-        async with aiosqlite.connect(self.db_name) as db:
-            # Botlar jadvali
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS bots (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    token TEXT UNIQUE NOT NULL,
-                    name TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Kanallar jadvali
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS channels (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    bot_id INTEGER NOT NULL,
-                    channel_id TEXT NOT NULL,
-                    username TEXT,
-                    title TEXT,
-                    type TEXT NOT NULL,
-                    invite_link TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (bot_id) REFERENCES bots (id) ON DELETE CASCADE,
-                    UNIQUE(bot_id, channel_id)
-                )
-            """)
-            
-            # Foydalanuvchilar jadvali
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS users (
-                    user_id INTEGER PRIMARY KEY,
-                    username TEXT,
-                    first_name TEXT,
-                    last_name TEXT,
-                    first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Fayllar jadvali
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS files (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    bot_id INTEGER NOT NULL,
-                    file_id TEXT NOT NULL,
-                    file_type TEXT NOT NULL,
-                    file_name TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (bot_id) REFERENCES bots (id) ON DELETE CASCADE
-                )
-            """)
-            
-            # Yuklab olishlar jadvali
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS downloads (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    file_id INTEGER NOT NULL,
-                    downloaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users (user_id),
-                    FOREIGN KEY (file_id) REFERENCES files (id)
-                )
-            """)
-            
-            await db.commit()
+        """Database sxemasini oxirgi versiyaga migratsiya qilish"""
+        await migrate(self.db_name)
     
     # ===== BOT FUNKSIYALARI =====
     async def add_bot(self, token: str, name: str) -> int:
@@ -84,23 +46,84 @@ class Database:
             await db.commit()
             return cursor.lastrowid
     
-    async def get_bot_by_token(self, token: str) -> Optional[Dict]:
+    async def get_bot_by_token(self, token: str) -> Optional[BotRecord]:
         """Token orqali botni olish"""
         async with aiosqlite.connect(self.db_name) as db:
-            db.row_factory = aiosqlite.Row
+            db.row_factory = record_factory(BotRecord)
             cursor = await db.execute(
-                "SELECT * FROM bots WHERE token = ?", (token,)
+                f"SELECT {BOT_COLUMNS} FROM bots WHERE token = ?", (token,)
             )
-            row = await cursor.fetchone()
-            return dict(row) if row else None
+            return await cursor.fetchone()
     
-    async def get_all_bots(self) -> List[Dict]:
+    async def get_all_bots(self) -> List[BotRecord]:
         """Barcha botlarni olish"""
         async with aiosqlite.connect(self.db_name) as db:
-            db.row_factory = aiosqlite.Row
-            cursor = await db.execute("SELECT * FROM bots ORDER BY created_at DESC")
-            rows = await cursor.fetchall()
-            return [dict(row) for row in rows]
+            db.row_factory = record_factory(BotRecord)
+            cursor = await db.execute(f"SELECT {BOT_COLUMNS} FROM bots ORDER BY created_at DESC")
+            return await cursor.fetchall()
+    
+    async def get_bot(self, bot_id: int) -> Optional[BotRecord]:
+        """ID orqali botni olish"""
+        async with aiosqlite.connect(self.db_name) as db:
+            db.row_factory = record_factory(BotRecord)
+            cursor = await db.execute(
+                f"SELECT {BOT_COLUMNS} FROM bots WHERE id = ?", (bot_id,)
+            )
+            return await cursor.fetchone()
+    
+    async def get_bots_page(self, cursor_id: int = None, direction: str = "next",
+                            limit: int = 10) -> Dict:
+        """Botlar sahifasi (created_at, id) bo'yicha keyset pagination"""
+        return await self._get_page(BotRecord, "bots", "", (), "bots", cursor_id, direction, limit)
+    
+    async def _get_page(self, record_cls, table: str, where: str, params: tuple, counter_key: str,
+                        cursor_id: Optional[int], direction: str, limit: int) -> Dict:
+        """
+        Keyset sahifa: created_at DESC, id DESC tartibida
+        cursor_id - oldingi sahifaning oxirgi (next) yoki birinchi (prev) elementi.
+        Returns: {'items': [record_cls, ...], 'has_prev', 'has_next', 'total'}
+        """
+        conditions = [where] if where else []
+        params = list(params)
+        if cursor_id is not None:
+            op = "<" if direction == "next" else ">"
+            conditions.append(
+                f"(created_at, id) {op} (SELECT created_at, id FROM {table} WHERE id = ?)"
+            )
+            params.append(cursor_id)
+        
+        order = "DESC" if direction == "next" else "ASC"
+        where_sql = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        async with aiosqlite.connect(self.db_name) as db:
+            cursor = await db.execute(
+                "SELECT value FROM counters WHERE key = ?", (counter_key,)
+            )
+            total = await cursor.fetchone()
+            
+            db.row_factory = record_factory(record_cls)
+            cursor = await db.execute(
+                f"""SELECT {', '.join(record_cls._fields)} FROM {table} {where_sql}
+                    ORDER BY created_at {order}, id {order}
+                    LIMIT ?""",
+                (*params, limit + 1)
+            )
+            rows = list(await cursor.fetchall())
+        
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if direction == "next":
+            has_prev, has_next = cursor_id is not None, has_more
+        else:
+            rows.reverse()
+            has_prev, has_next = has_more, cursor_id is not None
+        
+        return {
+            'items': rows,
+            'has_prev': has_prev,
+            'has_next': has_next,
+            'total': total[0] if total else 0,
+        }
     
     # ===== KANAL FUNKSIYALARI =====
     async def add_channel(self, bot_id: int, channel_id: str, username: str, 
@@ -118,6 +141,26 @@ class Database:
         except aiosqlite.IntegrityError:
             return False
     
+    async def add_channels(self, bot_id: int, channels: List[Dict]) -> List[bool]:
+        """Ko'plab kanal qo'shish (bitta tranzaksiya)
+        channels: [{'channel_id', 'username', 'title', 'channel_type', 'invite_link'}, ...]
+        Returns: har bir kanal uchun qo'shildimi (False - allaqachon bor)
+        """
+        if not channels:
+            return []
+        results = []
+        async with aiosqlite.connect(self.db_name) as db:
+            for ch in channels:
+                cursor = await db.execute(
+                    """INSERT OR IGNORE INTO channels (bot_id, channel_id, username, title, type, invite_link)
+                       VALUES (?, ?, ?, ?, ?, ?)""",
+                    (bot_id, ch['channel_id'], ch['username'], ch['title'],
+                     ch['channel_type'], ch['invite_link'])
+                )
+                results.append(cursor.rowcount > 0)
+            await db.commit()
+        return results
+    
     async def remove_channel(self, bot_id: int, channel_id: str) -> bool:
         """Kanalni o'chirish"""
         async with aiosqlite.connect(self.db_name) as db:
@@ -128,32 +171,91 @@ class Database:
             await db.commit()
             return cursor.rowcount > 0
     
-    async def get_channels(self, bot_id: int) -> List[Dict]:
+    async def get_channels(self, bot_id: int) -> List[ChannelRecord]:
         """Bot kanallarini olish"""
         async with aiosqlite.connect(self.db_name) as db:
-            db.row_factory = aiosqlite.Row
+            db.row_factory = record_factory(ChannelRecord)
+            cursor = await db.execute(
+                f"SELECT {CHANNEL_COLUMNS} FROM channels WHERE bot_id = ? ORDER BY created_at DESC",
+                (bot_id,)
+            )
+            return await cursor.fetchall()
+    
+    async def get_gate_channels(self, bot_id: int) -> List[ChannelRecord]:
+        """Obuna tekshiruvidagi kanallar (karantindagilarsiz)"""
+        async with aiosqlite.connect(self.db_name) as db:
+            db.row_factory = record_factory(ChannelRecord)
             cursor = await db.execute(
-                "SELECT * FROM channels WHERE bot_id = ? ORDER BY created_at DESC",
+                f"""SELECT {CHANNEL_COLUMNS} FROM channels WHERE bot_id = ? AND quarantined = 0
+                    ORDER BY created_at DESC""",
                 (bot_id,)
             )
+            return await cursor.fetchall()
+    
+    async def get_all_channels_with_bot_names(self) -> List[tuple]:
+        """Barcha kanallar va ularning bot nomlari (holat monitoringi uchun)
+        Returns: [(ChannelRecord, bot_name), ...]
+        """
+        width = len(ChannelRecord._fields)
+        async with aiosqlite.connect(self.db_name) as db:
+            cursor = await db.execute(
+                f"""SELECT {', '.join('c.' + col for col in ChannelRecord._fields)}, b.name
+                    FROM channels c JOIN bots b ON b.id = c.bot_id"""
+            )
             rows = await cursor.fetchall()
-            return [dict(row) for row in rows]
+            return [(ChannelRecord._make(row[:width]), row[width]) for row in rows]
     
-    async def get_channel(self, bot_id: int, channel_id: str) -> Optional[Dict]:
+    async def update_channels_health(self, updates: List[tuple]):
+        """Kanallar holatini bitta tranzaksiyada yangilash
+        updates: [(channel_db_id, quarantined, reason), ...]
+        """
+        if not updates:
+            return
+        async with aiosqlite.connect(self.db_name) as db:
+            await db.executemany(
+                """UPDATE channels
+                   SET quarantined = ?, quarantine_reason = ?, checked_at = CURRENT_TIMESTAMP
+                   WHERE id = ?""",
+                [(int(quarantined), reason, channel_db_id)
+                 for channel_db_id, quarantined, reason in updates]
+            )
+            await db.commit()
+    
+    async def get_channels_page(self, bot_id: int, cursor_id: int = None,
+                                direction: str = "next", limit: int = 10) -> Dict:
+        """Bot kanallari sahifasi (created_at, id) bo'yicha keyset pagination"""
+        return await self._get_page(
+            ChannelRecord, "channels", "bot_id = ?", (bot_id,), f"channels:{bot_id}",
+            cursor_id, direction, limit
+        )
+    
+    async def get_channel_by_id(self, channel_db_id: int) -> Optional[ChannelRecord]:
+        """DB ID orqali kanalni olish"""
+        async with aiosqlite.connect(self.db_name) as db:
+            db.row_factory = record_factory(ChannelRecord)
+            cursor = await db.execute(
+                f"SELECT {CHANNEL_COLUMNS} FROM channels WHERE id = ?", (channel_db_id,)
+            )
+            return await cursor.fetchone()
+    
+    async def get_channel(self, bot_id: int, channel_id: str) -> Optional[ChannelRecord]:
         """Bitta kanalni olish"""
         async with aiosqlite.connect(self.db_name) as db:
-            db.row_factory = aiosqlite.Row
+            db.row_factory = record_factory(ChannelRecord)
             cursor = await db.execute(
-                "SELECT * FROM channels WHERE bot_id = ? AND channel_id = ?",
+                f"SELECT {CHANNEL_COLUMNS} FROM channels WHERE bot_id = ? AND channel_id = ?",
                 (bot_id, channel_id)
             )
-            row = await cursor.fetchone()
-            return dict(row) if row else None
+            return await cursor.fetchone()
     
     # ===== FOYDALANUVCHI FUNKSIYALARI =====
     async def add_user(self, user_id: int, username: str = None, 
                       first_name: str = None, last_name: str = None):
-        """Foydalanuvchi qo'shish yoki yangilash"""
+        """Foydalanuvchi qo'shish yoki yangilash (profil o'zgarmagan bo'lsa - hech narsa qilmaydi)"""
+        fingerprint = profile_fingerprint(username, first_name, last_name)
+        if self.user_fingerprints is not None and self.user_fingerprints.get(user_id) == fingerprint:
+            return
+        
         async with aiosqlite.connect(self.db_name) as db:
             await db.execute(
                 """INSERT INTO users (user_id, username, first_name, last_name) 
@@ -165,6 +267,39 @@ class Database:
                 (user_id, username, first_name, last_name)
             )
             await db.commit()
+        
+        if self.user_fingerprints is not None:
+            self.user_fingerprints.set(user_id, fingerprint)
+    
+    async def warm_user_cache(self, owns: Optional[Callable[[int], bool]] = None,
+                              chunk_size: int = 5000) -> int:
+        """Profil keshini eng yangi foydalanuvchilar bilan to'ldirish
+        owns - worker rejimida: faqat shu workerga tushadigan user_id lar yuklanadi
+        Returns: keshga yuklangan foydalanuvchilar soni
+        """
+        if self.user_fingerprints is None:
+            return 0
+        limit = self.user_fingerprints.maxsize
+        rows = []
+        async with aiosqlite.connect(self.db_name) as db:
+            # idx_users_first_seen bo'yicha - to'liq saralashsiz; kesh to'lganda to'xtaydi
+            cursor = await db.execute(
+                """SELECT user_id, username, first_name, last_name FROM users
+                   ORDER BY first_seen DESC"""
+            )
+            while len(rows) < limit:
+                chunk = await cursor.fetchmany(chunk_size)
+                if not chunk:
+                    break
+                rows.extend(row for row in chunk if owns is None or owns(row[0]))
+            await cursor.close()
+        rows = rows[:limit]
+        # Eskidan yangiga - eng yangilari LRU oxirida qoladi
+        for user_id, username, first_name, last_name in reversed(rows):
+            self.user_fingerprints.set(
+                user_id, profile_fingerprint(username, first_name, last_name)
+            )
+        return len(rows)
     
     async def get_user_count(self) -> int:
         """Foydalanuvchilar sonini olish"""
@@ -186,43 +321,348 @@ class Database:
             await db.commit()
             return cursor.lastrowid
     
-    async def get_file(self, file_db_id: int) -> Optional[Dict]:
+    async def get_file(self, file_db_id: int) -> Optional[FileRecord]:
         """Faylni olish"""
         async with aiosqlite.connect(self.db_name) as db:
-            db.row_factory = aiosqlite.Row
+            db.row_factory = record_factory(FileRecord)
             cursor = await db.execute(
-                "SELECT * FROM files WHERE id = ?", (file_db_id,)
+                f"SELECT {FILE_COLUMNS} FROM files WHERE id = ?", (file_db_id,)
             )
-            row = await cursor.fetchone()
-            return dict(row) if row else None
+            return await cursor.fetchone()
+    
+    async def get_files(self, bot_id: Optional[int] = None) -> List[FileRecord]:
+        """Barcha fayllar (yoki bitta botniki) - tugmalarni qayta chiqarish uchun"""
+        async with aiosqlite.connect(self.db_name) as db:
+            db.row_factory = record_factory(FileRecord)
+            if bot_id is None:
+                cursor = await db.execute(f"SELECT {FILE_COLUMNS} FROM files ORDER BY id")
+            else:
+                cursor = await db.execute(
+                    f"SELECT {FILE_COLUMNS} FROM files WHERE bot_id = ? ORDER BY id", (bot_id,)
+                )
+            return await cursor.fetchall()
     
     # ===== YUKLAB OLISH FUNKSIYALARI =====
+    async def get_download_gate(self, file_db_id: int, user_id: int) -> Optional[DownloadGate]:
+        """
+        Fayl, uning botidagi obuna kanallari, foydalanuvchining so'rovlari, keshlangan
+        a'zoliklari va avval yuklab olganligi - bitta JOIN so'rovida
+        (har bir bosish uchun bitta round trip)
+        """
+        file_width = len(FileRecord._fields)
+        channel_width = len(ChannelRecord._fields)
+        async with aiosqlite.connect(self.db_name) as db:
+            cursor = await db.execute(
+                f"""SELECT {', '.join('f.' + col for col in FileRecord._fields)},
+                           {', '.join('c.' + col for col in ChannelRecord._fields)},
+                           EXISTS(SELECT 1 FROM downloads d
+                                  WHERE d.user_id = ? AND d.file_id = f.id)
+                           OR EXISTS(SELECT 1 FROM archived_downloads a
+                                     WHERE a.user_id = ? AND a.file_id = f.id),
+                           jr.user_id IS NOT NULL,
+                           m.user_id IS NOT NULL
+                    FROM files f
+                    LEFT JOIN channels c ON c.bot_id = f.bot_id AND c.quarantined = 0
+                    LEFT JOIN join_requests jr
+                           ON c.type = 'private' AND jr.user_id = ? AND jr.channel_id = c.channel_id
+                          AND jr.status IN ('pending', 'approved')
+                    LEFT JOIN memberships m
+                           ON m.user_id = ? AND m.channel_id = c.channel_id AND m.expires_at > ?
+                    WHERE f.id = ?
+                    ORDER BY c.created_at DESC""",
+                (user_id, user_id, user_id, user_id, time.time(), file_db_id)
+            )
+            rows = await cursor.fetchall()
+        
+        if not rows:
+            return None
+        
+        channels, requested, members = [], set(), set()
+        for row in rows:
+            # Kanalsiz bot: LEFT JOIN bitta NULL qator qaytaradi
+            if row[file_width] is None:
+                continue
+            channel = ChannelRecord._make(row[file_width:file_width + channel_width])
+            channels.append(channel)
+            if row[-2]:
+                requested.add(channel.channel_id)
+            if row[-1]:
+                members.add(channel.channel_id)
+        
+        return DownloadGate(
+            file=FileRecord._make(rows[0][:file_width]),
+            channels=channels,
+            requested=requested,
+            members=members,
+            downloaded=bool(rows[0][-3]),
+        )
+    
+    async def get_channel_gate(self, bot_id: int, user_id: int) -> ChannelGate:
+        """Bot obuna kanallari, foydalanuvchi so'rovlari va keshlangan a'zoliklari - bitta so'rov"""
+        width = len(ChannelRecord._fields)
+        async with aiosqlite.connect(self.db_name) as db:
+            cursor = await db.execute(
+                f"""SELECT {', '.join('c.' + col for col in ChannelRecord._fields)},
+                           jr.user_id IS NOT NULL,
+                           m.user_id IS NOT NULL
+                    FROM channels c
+                    LEFT JOIN join_requests jr
+                           ON c.type = 'private' AND jr.user_id = ? AND jr.channel_id = c.channel_id
+                          AND jr.status IN ('pending', 'approved')
+                    LEFT JOIN memberships m
+                           ON m.user_id = ? AND m.channel_id = c.channel_id AND m.expires_at > ?
+                    WHERE c.bot_id = ? AND c.quarantined = 0
+                    ORDER BY c.created_at DESC""",
+                (user_id, user_id, time.time(), bot_id)
+            )
+            rows = await cursor.fetchall()
+        
+        channels, requested, members = [], set(), set()
+        for row in rows:
+            channel = ChannelRecord._make(row[:width])
+            channels.append(channel)
+            if row[width]:
+                requested.add(channel.channel_id)
+            if row[width + 1]:
+                members.add(channel.channel_id)
+        return ChannelGate(channels, requested, members)
+    
+    async def get_file_for_user(self, file_db_id: int, user_id: int) -> Optional[tuple]:
+        """
+        Fayl va foydalanuvchi uni avval yuklab olganmi - bitta so'rov
+        Returns: (FileRecord, already_downloaded) yoki None
+        """
+        async with aiosqlite.connect(self.db_name) as db:
+            cursor = await db.execute(
+                f"""SELECT {FILE_COLUMNS},
+                           EXISTS(SELECT 1 FROM downloads d
+                                  WHERE d.user_id = ? AND d.file_id = files.id)
+                           OR EXISTS(SELECT 1 FROM archived_downloads a
+                                     WHERE a.user_id = ? AND a.file_id = files.id)
+                    FROM files WHERE id = ?""",
+                (user_id, user_id, file_db_id)
+            )
+            row = await cursor.fetchone()
+        return (FileRecord._make(row[:-1]), bool(row[-1])) if row else None
+    
+    async def add_memberships(self, user_id: int, channel_ids: List[str]):
+        """
+        Tasdiqlangan obunalarni umumiy keshga yozish (boshqa workerlar ham ko'radi)
+        Hali amal qilayotgan yozuv (boshqa worker yangilagan) qayta yozilmaydi.
+        """
+        if not self.membership_ttl or not channel_ids:
+            return
+        now = time.time()
+        async with aiosqlite.connect(self.db_name) as db:
+            await db.executemany(
+                """INSERT INTO memberships (user_id, channel_id, expires_at) VALUES (?, ?, ?)
+                   ON CONFLICT (user_id, channel_id) DO UPDATE SET expires_at = excluded.expires_at
+                   WHERE memberships.expires_at <= ?""",
+                [(user_id, channel_id, now + self.membership_ttl, now) for channel_id in channel_ids]
+            )
+            await db.commit()
+    
+    async def prune_memberships(self) -> int:
+        """Muddati o'tgan a'zolik keshi yozuvlarini o'chirish"""
+        async with aiosqlite.connect(self.db_name) as db:
+            cursor = await db.execute(
+                "DELETE FROM memberships WHERE expires_at <= ?", (time.time(),)
+            )
+            await db.commit()
+            return cursor.rowcount
+    
     async def add_download(self, user_id: int, file_id: int):
-        """Yuklab olish qayd qilish"""
+        """Yuklab olish qayd qilish (arxivlangan juftlik qayta hisoblanmaydi)"""
         async with aiosqlite.connect(self.db_name) as db:
             await db.execute(
-                "INSERT INTO downloads (user_id, file_id) VALUES (?, ?)",
-                (user_id, file_id)
+                """INSERT INTO downloads (user_id, file_id)
+                   SELECT ?, ?
+                   WHERE NOT EXISTS (SELECT 1 FROM archived_downloads
+                                     WHERE user_id = ? AND file_id = ?)""",
+                (user_id, file_id, user_id, file_id)
             )
             await db.commit()
     
     async def check_downloaded(self, user_id: int, file_id: int) -> bool:
-        """Foydalanuvchi faylni yuklab olganmi?"""
+        """Foydalanuvchi faylni yuklab olganmi? (arxivlanganlar bilan)"""
         async with aiosqlite.connect(self.db_name) as db:
             cursor = await db.execute(
-                "SELECT COUNT(*) FROM downloads WHERE user_id = ? AND file_id = ?",
-                (user_id, file_id)
+                """SELECT EXISTS(SELECT 1 FROM downloads WHERE user_id = ? AND file_id = ?)
+                       OR EXISTS(SELECT 1 FROM archived_downloads WHERE user_id = ? AND file_id = ?)""",
+                (user_id, file_id, user_id, file_id)
             )
-            count = await cursor.fetchone()
-            return count[0] > 0 if count else False
+            row = await cursor.fetchone()
+            return bool(row[0]) if row else False
     
     async def get_download_count(self) -> int:
-        """Jami yuklab olishlar soni"""
+        """Jami yuklab olishlar soni (arxivlanganlar bilan)"""
         async with aiosqlite.connect(self.db_name) as db:
-            cursor = await db.execute("SELECT COUNT(*) FROM downloads")
+            cursor = await db.execute(
+                """SELECT (SELECT COUNT(*) FROM downloads)
+                        + (SELECT COALESCE(SUM(downloads), 0) FROM download_archive_counts)"""
+            )
             count = await cursor.fetchone()
             return count[0] if count else 0
     
+    # ===== EKSPORT =====
+    async def iter_export_rows(self, table: str, chunk_size: int = 1000) -> AsyncIterator[List[tuple]]:
+        """
+        Jadval qatorlarini bo'laklab o'qish (xotira jadval hajmiga bog'liq emas)
+        Har bir bo'lak - alohida qisqa so'rov (birinchi ustun - kalit bo'yicha keyset):
+        bo'laklar orasida ochiq statement va o'qish qulfi qolmaydi.
+        """
+        columns = EXPORT_TABLES[table]
+        key = columns[0]
+        last = None
+        async with aiosqlite.connect(self.db_name) as db:
+            while True:
+                where = f"WHERE {key} > ?" if last is not None else ""
+                cursor = await db.execute(
+                    f"""SELECT {', '.join(columns)} FROM {table} {where}
+                        ORDER BY {key} LIMIT ?""",
+                    (*(() if last is None else (last,)), chunk_size)
+                )
+                rows = await cursor.fetchall()
+                await cursor.close()
+                if not rows:
+                    break
+                last = rows[-1][0]
+                yield rows
+    
+    # ===== ARXIV VA TEXNIK XIZMAT =====
+    async def get_old_downloads(self, retention_days: int, limit: int) -> List[Dict]:
+        """Saqlash muddatidan eski yuklab olishlarni id tartibida olish"""
+        async with aiosqlite.connect(self.db_name) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(
+                """SELECT * FROM downloads
+                   WHERE downloaded_at < datetime('now', ?)
+                   ORDER BY id
+                   LIMIT ?""",
+                (f"-{int(retention_days)} days", limit)
+            )
+            rows = await cursor.fetchall()
+            return [dict(row) for row in rows]
+    
+    async def delete_archived_downloads(self, rows: List[Dict]):
+        """
+        Arxivga yozilgan qatorlarni o'chirish va oylik hisoblagichlarni oshirish (bitta tranzaksiya).
+        (user_id, file_id) juftlari archived_downloads da qoladi - "avval yuklab olgan"
+        tekshiruvi ishlayveradi va qayta yuklab olish jami songa qo'shilmaydi.
+        """
+        if not rows:
+            return
+        months = {}
+        for row in rows:
+            month = str(row['downloaded_at'])[:7]
+            months[month] = months.get(month, 0) + 1
+        
+        async with aiosqlite.connect(self.db_name) as db:
+            await db.executemany(
+                "DELETE FROM downloads WHERE id = ?",
+                [(row['id'],) for row in rows]
+            )
+            await db.executemany(
+                "INSERT OR IGNORE INTO archived_downloads (user_id, file_id) VALUES (?, ?)",
+                [(row['user_id'], row['file_id']) for row in rows]
+            )
+            await db.executemany(
+                """INSERT INTO download_archive_counts (month, downloads) VALUES (?, ?)
+                   ON CONFLICT(month) DO UPDATE SET downloads = downloads + excluded.downloads""",
+                list(months.items())
+            )
+            await db.commit()
+    
+    async def get_auto_vacuum_mode(self) -> int:
+        """PRAGMA auto_vacuum (0 - none, 1 - full, 2 - incremental)"""
+        async with aiosqlite.connect(self.db_name) as db:
+            cursor = await db.execute("PRAGMA auto_vacuum")
+            row = await cursor.fetchone()
+            return row[0] if row else 0
+    
+    async def incremental_vacuum(self, pages: int) -> int:
+        """Bo'sh sahifalarning bir qismini bo'shatish
+        Returns: qolgan bo'sh sahifalar soni
+        """
+        async with aiosqlite.connect(self.db_name) as db:
+            cursor = await db.execute(f"PRAGMA incremental_vacuum({int(pages)})")
+            await cursor.fetchall()
+            cursor = await db.execute("PRAGMA freelist_count")
+            row = await cursor.fetchone()
+            return row[0] if row else 0
+    
+    async def optimize(self):
+        """PRAGMA optimize - query planner statistikasini yangilash"""
+        async with aiosqlite.connect(self.db_name) as db:
+            await db.execute("PRAGMA optimize")
+    
+    # ===== QO'SHILISH SO'ROVLARI =====
+    async def add_join_request(self, user_id: int, channel_id: str) -> bool:
+        """Qo'shilish so'rovini qayd qilish (pending holatida)
+        Faqat channels dagi private kanallar uchun - boshqa chat'larda
+        so'rovlar admin qo'lida qoladi.
+        Returns: True - qayd qilindi
+        """
+        async with aiosqlite.connect(self.db_name) as db:
+            cursor = await db.execute(
+                """INSERT INTO join_requests (user_id, channel_id, status)
+                   SELECT ?, ?, 'pending'
+                   WHERE EXISTS (SELECT 1 FROM channels WHERE channel_id = ? AND type = 'private')
+                   ON CONFLICT(user_id, channel_id) DO UPDATE SET
+                   status = 'pending',
+                   requested_at = CURRENT_TIMESTAMP,
+                   processed_at = NULL""",
+                (user_id, channel_id, channel_id)
+            )
+            await db.commit()
+            return cursor.rowcount > 0
+    
+    async def get_pending_join_requests(self, limit: int) -> List[Dict]:
+        """Eng eski tasdiqlanmagan so'rovlarni olish (faqat private kanallar)"""
+        async with aiosqlite.connect(self.db_name) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(
+                """SELECT jr.user_id, jr.channel_id FROM join_requests jr
+                   WHERE jr.status = 'pending'
+                   AND EXISTS (SELECT 1 FROM channels c
+                               WHERE c.channel_id = jr.channel_id AND c.type = 'private')
+                   ORDER BY jr.requested_at
+                   LIMIT ?""",
+                (limit,)
+            )
+            rows = await cursor.fetchall()
+            return [dict(row) for row in rows]
+    
+    async def set_join_requests_status(self, requests: List[tuple], status: str):
+        """So'rovlar holatini bitta tranzaksiyada yangilash
+        requests: [(user_id, channel_id), ...]
+        """
+        if not requests:
+            return
+        async with aiosqlite.connect(self.db_name) as db:
+            await db.executemany(
+                """UPDATE join_requests
+                   SET status = ?, processed_at = CURRENT_TIMESTAMP
+                   WHERE user_id = ? AND channel_id = ?""",
+                [(status, user_id, channel_id) for user_id, channel_id in requests]
+            )
+            await db.commit()
+    
+    async def get_requested_channels(self, user_id: int, channel_ids: List[str]) -> set:
+        """Foydalanuvchi so'rov yuborgan (pending yoki approved) kanallar"""
+        if not channel_ids:
+            return set()
+        placeholders = ", ".join("?" for _ in channel_ids)
+        async with aiosqlite.connect(self.db_name) as db:
+            cursor = await db.execute(
+                f"""SELECT channel_id FROM join_requests
+                    WHERE user_id = ? AND channel_id IN ({placeholders})
+                    AND status IN ('pending', 'approved')""",
+                (user_id, *channel_ids)
+            )
+            rows = await cursor.fetchall()
+            return {row[0] for row in rows}
+    
     # ===== STATISTIKA =====
     async def get_stats(self, bot_id: int = None) -> Dict:
         """Statistika olish"""
@@ -233,8 +673,11 @@ class Database:
             cursor = await db.execute("SELECT COUNT(*) FROM users")
             stats['total_users'] = (await cursor.fetchone())[0]
             
-            # Yuklab olishlar
-            cursor = await db.execute("SELECT COUNT(*) FROM downloads")
+            # Yuklab olishlar (arxivlanganlar bilan)
+            cursor = await db.execute(
+                """SELECT (SELECT COUNT(*) FROM downloads)
+                        + (SELECT COALESCE(SUM(downloads), 0) FROM download_archive_counts)"""
+            )
             stats['total_downloads'] = (await cursor.fetchone())[0]
             
             if bot_id:
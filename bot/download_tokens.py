@@ -0,0 +1,69 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import struct
+from typing import NamedTuple, Optional
+
+from config import CALLBACK_SECRET, USER_BOT_TOKEN
+
+# Callback data: "download_" + base64url(file_db_id, bot_id, media turi + HMAC)
+# 9 + 39 = 48 bayt (Telegram limiti - 64)
+PREFIX = "download_"
+MEDIA_TYPES = ("video", "document", "photo", "audio")
+MAC_SIZE = 12  # 96 bit - soxtalashtirish uchun yetarli
+
+_payload = struct.Struct(">QQB")
+_token_length = len(base64.urlsafe_b64encode(bytes(_payload.size + MAC_SIZE)).rstrip(b"="))  # 39
+_key = hashlib.sha256(f"download:{CALLBACK_SECRET or USER_BOT_TOKEN}".encode()).digest()
+
+class DownloadToken(NamedTuple):
+    file_db_id: int
+    bot_id: int
+    file_type: str
+
+def _sign(payload: bytes) -> bytes:
+    return hmac.new(_key, payload, hashlib.sha256).digest()[:MAC_SIZE]
+
+def _encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+def encode_download_token(file_db_id: int, bot_id: int, file_type: str) -> str:
+    """
+    Yuklab olish tugmasi uchun imzolangan callback data
+    Raises: ValueError - media turi MEDIA_TYPES da yo'q (files.file_type erkin TEXT)
+    """
+    if file_type not in MEDIA_TYPES:
+        raise ValueError(f"noma'lum media turi {file_type!r} (kutilgan: {', '.join(MEDIA_TYPES)})")
+    payload = _payload.pack(file_db_id, bot_id, MEDIA_TYPES.index(file_type))
+    return PREFIX + _encode(payload + _sign(payload))
+
+def decode_download_token(data: str) -> Optional[DownloadToken]:
+    """
+    Callback data ni tekshirish (I/O siz)
+    Returns: DownloadToken yoki None - soxta/buzilgan/eski formatdagi tugma
+    """
+    if not data or not data.startswith(PREFIX) or len(data) != len(PREFIX) + _token_length:
+        return None
+    encoded = data[len(PREFIX):]
+    try:
+        raw = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+    except (binascii.Error, ValueError):
+        return None
+    # Kanonik shakl: bitta token - bitta callback data (single-flight kaliti uchun)
+    if _encode(raw) != encoded:
+        return None
+
+    payload, mac = raw[:_payload.size], raw[_payload.size:]
+    if not hmac.compare_digest(mac, _sign(payload)):
+        return None
+    file_db_id, bot_id, media = _payload.unpack(payload)
+    if media >= len(MEDIA_TYPES):
+        return None
+    return DownloadToken(file_db_id, bot_id, MEDIA_TYPES[media])
+
+def legacy_file_id(data: str) -> Optional[int]:
+    """Eski "download_<id>" formatidagi fayl ID si"""
+    value = data[len(PREFIX):] if data and data.startswith(PREFIX) else ""
+    # isdigit() unicode raqamlarni ham qabul qiladi ("²", "١") - faqat ASCII
+    return int(value) if value.isascii() and value.isdigit() else None
@@ -0,0 +1,52 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+
+from database import Database, EXPORT_TABLES
+
+EXPORT_FORMATS = ("csv", "jsonl")
+EXPORT_CHUNK_SIZE = 2000
+
+def _encode_chunk(fmt: str, columns: tuple, rows: list) -> bytes:
+    """Bo'lakni CSV yoki JSONL baytlariga aylantirish"""
+    if fmt == "csv":
+        buf = io.StringIO()
+        csv.writer(buf).writerows(rows)
+        return buf.getvalue().encode("utf-8")
+    return "".join(
+        json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n" for row in rows
+    ).encode("utf-8")
+
+def _write_chunk(f, fmt: str, columns: tuple, rows: list) -> None:
+    f.write(_encode_chunk(fmt, columns, rows))
+
+async def export_table(db: Database, table: str, fmt: str) -> tuple[str, int]:
+    """
+    Jadvalni gzip siqilgan vaqtinchalik faylga oqim bilan yozish
+    Har bir bo'lak alohida threadda siqiladi - event loop bloklanmaydi.
+    Returns: (fayl_yo'li, qatorlar_soni). Faylni chaqiruvchi o'chiradi.
+    """
+    columns = EXPORT_TABLES[table]
+    fd, path = tempfile.mkstemp(prefix=f"{table}-", suffix=f".{fmt}.gz")
+    os.close(fd)
+
+    count = 0
+    try:
+        f = gzip.open(path, "wb")
+        try:
+            if fmt == "csv":
+                await asyncio.to_thread(_write_chunk, f, fmt, columns, [columns])
+            async for rows in db.iter_export_rows(table, EXPORT_CHUNK_SIZE):
+                await asyncio.to_thread(_write_chunk, f, fmt, columns, rows)
+                count += len(rows)
+        finally:
+            await asyncio.to_thread(f.close)
+    except Exception:
+        os.remove(path)
+        raise
+
+    return path, count
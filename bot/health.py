@@ -0,0 +1,96 @@
+import asyncio
+import html
+import logging
+from typing import Awaitable, Callable, Dict, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+
+from config import HEALTH_CHECK_INTERVAL, HEALTH_CHECK_CONCURRENCY
+from database import Database
+from records import ChannelRecord
+
+logger = logging.getLogger(__name__)
+
+async def check_channel(bot: Bot, channel: ChannelRecord) -> Optional[str]:
+    """
+    Bot kanalda adminmi?
+    Returns: None - sog'lom, str - buzilish sababi.
+    Tarmoq xatolarida exception ko'tariladi (holat o'zgartirilmaydi).
+    """
+    try:
+        member = await bot.get_chat_member(channel.channel_id, bot.id)
+    except (TelegramForbiddenError, TelegramBadRequest) as e:
+        return str(e)
+
+    if member.status not in ['administrator', 'creator']:
+        return f"bot holati: {member.status}"
+    return None
+
+async def check_channels_health(
+    db: Database, bot: Bot, notify: Callable[[str], Awaitable[None]]
+) -> Dict:
+    """
+    Barcha kanallarni parallel tekshirish, buzilganlarini karantinga olish,
+    tiklanganlarini qaytarish va o'zgarishlar haqida adminga xabar berish.
+    bot - obunani tekshiradigan user bot (USER_BOT_TOKEN): karantin aynan
+    uning huquqlariga qarab belgilanadi.
+    Returns: {'checked', 'quarantined', 'recovered'}
+    """
+    channels = await db.get_all_channels_with_bot_names()
+    semaphore = asyncio.Semaphore(HEALTH_CHECK_CONCURRENCY)
+
+    async def check(channel: ChannelRecord):
+        async with semaphore:
+            try:
+                return await check_channel(bot, channel)
+            except Exception as e:
+                logger.warning(f"Kanal {channel.channel_id} tekshirilmadi: {e}")
+                return e
+
+    results = await asyncio.gather(*(check(channel) for channel, _ in channels))
+
+    updates, quarantined, recovered = [], [], []
+    for (channel, bot_name), reason in zip(channels, results):
+        if isinstance(reason, Exception):
+            continue
+        updates.append((channel.id, reason is not None, reason))
+        if reason is not None and not channel.quarantined:
+            quarantined.append((channel, bot_name, reason))
+        elif reason is None and channel.quarantined:
+            recovered.append((channel, bot_name))
+
+    await db.update_channels_health(updates)
+
+    for channel, bot_name, reason in quarantined:
+        logger.warning(f"Kanal karantinga olindi {channel.channel_id}: {reason}")
+        await notify(
+            f"⛔ <b>Kanal karantinga olindi</b>\n\n"
+            f"📢 {html.escape(channel.title or '')} ({html.escape(str(channel.channel_id))})\n"
+            f"🤖 Bot: {html.escape(bot_name)}\n"
+            f"Sabab: {html.escape(reason)}\n\n"
+            f"Obuna tekshiruvida bu kanal vaqtincha hisobga olinmaydi."
+        )
+    for channel, bot_name in recovered:
+        logger.info(f"Kanal tiklandi {channel.channel_id}")
+        await notify(
+            f"✅ <b>Kanal tiklandi</b>\n\n"
+            f"📢 {html.escape(channel.title or '')} ({html.escape(str(channel.channel_id))})\n"
+            f"🤖 Bot: {html.escape(bot_name)}"
+        )
+
+    return {'checked': len(updates), 'quarantined': len(quarantined), 'recovered': len(recovered)}
+
+async def channel_health_worker(db: Database, bot: Bot, notify: Callable[[str], Awaitable[None]]):
+    """Davriy kanal holati tekshiruvi (fon vazifasi)"""
+    while True:
+        try:
+            result = await check_channels_health(db, bot, notify)
+            if result['quarantined'] or result['recovered']:
+                logger.info(f"Kanal holati: {result}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Kanal holati tekshiruvida xato: {e}")
+
+        await asyncio.sleep(HEALTH_CHECK_INTERVAL)
@@ -0,0 +1,47 @@
+from typing import Optional
+
+from aiogram.client.session.aiohttp import AiohttpSession
+
+from config import (
+    HTTP_POOL_LIMIT, HTTP_POOL_LIMIT_PER_HOST, HTTP_KEEPALIVE_TIMEOUT,
+    HTTP_DNS_CACHE_TTL, HTTP_REQUEST_TIMEOUT
+)
+
+class SharedAiohttpSession(AiohttpSession):
+    """
+    Barcha Bot obyektlari uchun bitta aiohttp sessiya (bitta connection pool)
+    Bot.session.close() (masalan, polling tugaganda) umumiy sessiyani yopmaydi -
+    uni faqat close_session() yopadi.
+    """
+
+    def __init__(self):
+        super().__init__(timeout=HTTP_REQUEST_TIMEOUT)
+        self._connector_init.update(
+            limit=HTTP_POOL_LIMIT,
+            limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+            keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+            use_dns_cache=True,
+            ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+        )
+
+    async def close(self) -> None:
+        pass
+
+    async def close_shared(self) -> None:
+        await super().close()
+
+_session: Optional[SharedAiohttpSession] = None
+
+def get_session() -> SharedAiohttpSession:
+    """Umumiy sessiyani olish (birinchi chaqiruvda yaratiladi)"""
+    global _session
+    if _session is None:
+        _session = SharedAiohttpSession()
+    return _session
+
+async def close_session() -> None:
+    """Umumiy sessiyani yopish (jarayon tugashida)"""
+    global _session
+    if _session is not None:
+        await _session.close_shared()
+        _session = None
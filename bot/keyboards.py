@@ -1,19 +1,22 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
-from typing import List, Dict
+from typing import List
 
-def get_channel_buttons(channels: List[Dict]) -> InlineKeyboardMarkup:
+from records import BotRecord, ChannelRecord, FileRecord
+from download_tokens import encode_download_token
+
+def get_channel_buttons(channels: List[ChannelRecord]) -> InlineKeyboardMarkup:
     """Kanallar uchun obuna tugmalari"""
     buttons = []
     
     for channel in channels:
-        if channel['username']:
-            url = f"https://t.me/{channel['username'].replace('@', '')}"
-        elif channel['invite_link']:
-            url = channel['invite_link']
+        if channel.username:
+            url = f"https://t.me/{channel.username.replace('@', '')}"
+        elif channel.invite_link:
+            url = channel.invite_link
         else:
             continue
         
-        button_text = f"📢 {channel['title']}"
+        button_text = f"📢 {channel.title}"
         buttons.append([InlineKeyboardButton(text=button_text, url=url)])
     
     # Tekshirish tugmasi
@@ -21,17 +24,19 @@ def get_channel_buttons(channels: List[Dict]) -> InlineKeyboardMarkup:
     
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
-def get_download_button(file_db_id: int) -> InlineKeyboardMarkup:
-    """Yuklab olish tugmasi (kanalda ishlatiladi)"""
+def get_download_button(file: FileRecord) -> InlineKeyboardMarkup:
+    """Yuklab olish tugmasi (kanalda ishlatiladi) - imzolangan callback token bilan"""
+    token = encode_download_token(file.id, file.bot_id, file.file_type)
     return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="⬇️ Yuklab olish", callback_data=f"download_{file_db_id}")]
+        [InlineKeyboardButton(text="⬇️ Yuklab olish", callback_data=token)]
     ])
 
 def get_admin_main_menu() -> ReplyKeyboardMarkup:
     """Admin asosiy menyu"""
     keyboard = [
         [KeyboardButton(text="🤖 Botlar"), KeyboardButton(text="📢 Kanallar")],
-        [KeyboardButton(text="📊 Statistika"), KeyboardButton(text="ℹ️ Yordam")]
+        [KeyboardButton(text="📊 Statistika"), KeyboardButton(text="ℹ️ Yordam")],
+        [KeyboardButton(text="📤 Eksport")]
     ]
     return ReplyKeyboardMarkup(keyboard=keyboard, resize_keyboard=True)
 
@@ -47,34 +52,51 @@ def get_channel_management_menu(bot_id: int) -> InlineKeyboardMarkup:
     """Kanal boshqaruv menyusi"""
     return InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="➕ Kanal qo'shish", callback_data=f"add_channel_{bot_id}")],
+        [InlineKeyboardButton(text="📥 Ko'plab kanal qo'shish", callback_data=f"bulk_channels_{bot_id}")],
         [InlineKeyboardButton(text="📋 Kanallar ro'yxati", callback_data=f"list_channels_{bot_id}")],
         [InlineKeyboardButton(text="🔙 Ortga", callback_data="main_menu")]
     ])
 
-def get_bots_list(bots: List[Dict]) -> InlineKeyboardMarkup:
-    """Botlar ro'yxati"""
+def get_page_nav(items: list, has_prev: bool, has_next: bool, prefix: str) -> List[InlineKeyboardButton]:
+    """Sahifalash tugmalari (callback: <prefix>_p_<id> / <prefix>_n_<id>)"""
+    nav = []
+    if items and has_prev:
+        nav.append(InlineKeyboardButton(text="⬅️ Oldingi", callback_data=f"{prefix}_p_{items[0].id}"))
+    if items and has_next:
+        nav.append(InlineKeyboardButton(text="Keyingi ➡️", callback_data=f"{prefix}_n_{items[-1].id}"))
+    return nav
+
+def get_bots_list(bots: List[BotRecord], has_prev: bool = False, has_next: bool = False) -> InlineKeyboardMarkup:
+    """Botlar ro'yxati (bitta sahifa)"""
     buttons = []
     for bot in bots:
         buttons.append([
             InlineKeyboardButton(
-                text=f"🤖 {bot['name']}", 
-                callback_data=f"bot_{bot['id']}"
+                text=f"🤖 {bot.name}", 
+                callback_data=f"bot_{bot.id}"
             )
         ])
+    nav = get_page_nav(bots, has_prev, has_next, "bpage")
+    if nav:
+        buttons.append(nav)
     buttons.append([InlineKeyboardButton(text="🔙 Ortga", callback_data="bots_menu")])
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
-def get_channels_list(channels: List[Dict], bot_id: int) -> InlineKeyboardMarkup:
-    """Kanallar ro'yxati"""
+def get_channels_list(channels: List[ChannelRecord], bot_id: int,
+                      has_prev: bool = False, has_next: bool = False) -> InlineKeyboardMarkup:
+    """Kanallar ro'yxati (bitta sahifa)"""
     buttons = []
     for channel in channels:
-        type_emoji = "🔒" if channel['type'] == "private" else "📢"
+        type_emoji = "🔒" if channel.type == "private" else "📢"
         buttons.append([
             InlineKeyboardButton(
-                text=f"{type_emoji} {channel['title']}", 
-                callback_data=f"channel_{channel['id']}"
+                text=f"{type_emoji} {channel.title}", 
+                callback_data=f"channel_{channel.id}"
             )
         ])
+    nav = get_page_nav(channels, has_prev, has_next, f"cpage_{bot_id}")
+    if nav:
+        buttons.append(nav)
     buttons.append([InlineKeyboardButton(text="🔙 Ortga", callback_data=f"bot_{bot_id}")])
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
@@ -85,6 +107,20 @@ def get_channel_actions(channel_id: int, bot_id: int) -> InlineKeyboardMarkup:
         [InlineKeyboardButton(text="🔙 Ortga", callback_data=f"list_channels_{bot_id}")]
     ])
 
+def get_export_menu() -> InlineKeyboardMarkup:
+    """Eksport menyusi"""
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [
+            InlineKeyboardButton(text="👥 Foydalanuvchilar (CSV)", callback_data="export_users_csv"),
+            InlineKeyboardButton(text="👥 Foydalanuvchilar (JSONL)", callback_data="export_users_jsonl")
+        ],
+        [
+            InlineKeyboardButton(text="⬇️ Yuklab olishlar (CSV)", callback_data="export_downloads_csv"),
+            InlineKeyboardButton(text="⬇️ Yuklab olishlar (JSONL)", callback_data="export_downloads_jsonl")
+        ],
+        [InlineKeyboardButton(text="🔙 Ortga", callback_data="main_menu")]
+    ])
+
 def get_cancel_button() -> InlineKeyboardMarkup:
     """Bekor qilish tugmasi"""
     return InlineKeyboardMarkup(inline_keyboard=[
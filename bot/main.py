@@ -1,12 +1,31 @@
 import asyncio
 import logging
+from typing import Optional
 from aiogram import Bot, Dispatcher, F
 from aiogram.filters import CommandStart
-from aiogram.types import Message, CallbackQuery
+from aiogram.types import Message, CallbackQuery, ChatJoinRequest, Update
 from aiogram.enums import ChatMemberStatus
+from aiogram.exceptions import (
+    TelegramAPIError, TelegramBadRequest, TelegramNetworkError, TelegramRetryAfter,
+    TelegramServerError
+)
 
-from config import USER_BOT_TOKEN, MESSAGES
+from config import (
+    USER_BOT_TOKEN, MESSAGES,
+    JOIN_APPROVE_BATCH_SIZE, JOIN_APPROVE_DELAY, JOIN_APPROVE_IDLE,
+    SCHEDULER_MAX_CONCURRENCY, SCHEDULER_MAX_QUEUE, SCHEDULER_SHED_TIMEOUT,
+    SCHEDULER_METRICS_INTERVAL, USER_CACHE_SIZE, MEMBERSHIP_CACHE_TTL, LEGACY_DOWNLOAD_IDS,
+    WORKERS, WORKER_INDEX
+)
 from database import Database
+from download_tokens import DownloadToken, decode_download_token, legacy_file_id
+from middlewares import SchedulerMiddleware, SingleFlightMiddleware
+from http_session import get_session, close_session
+from recording import setup_recording
+from tracing import (
+    TracingMiddleware, TracingRequestMiddleware, setup_tracing, shutdown_tracing,
+    set_attribute
+)
 from keyboards import get_channel_buttons
 
 # Logging sozlash
@@ -15,44 +34,78 @@ logger = logging.getLogger(__name__)
 print("Bot started")
 
 # Bot va dispatcher
-bot = Bot(token=USER_BOT_TOKEN)
+bot = Bot(token=USER_BOT_TOKEN, session=get_session())
 dp = Dispatcher()
-db = Database("bot_database.db")
+db = Database(
+    "bot_database.db", user_cache_size=USER_CACHE_SIZE, membership_ttl=MEMBERSHIP_CACHE_TTL
+)
 
-async def check_subscription(user_id: int, bot_id: int) -> tuple[bool, list]:
+# Update'larni yozib olish (RECORD_UPDATES=1) - eng birinchi middleware
+recorder = setup_recording(dp, "user")
+
+# Tracing: update uchun ildiz span + har bir API chaqiruvi
+dp.update.outer_middleware(TracingMiddleware())
+bot.session.middleware(TracingRequestMiddleware())
+
+def download_flight_key(update: Update):
+    """Single-flight kaliti: (user_id, callback data) yoki None"""
+    callback = update.callback_query
+    if callback and callback.data and callback.data.startswith("download_"):
+        return callback.from_user.id, callback.data
+    return None
+
+async def answer_duplicate_download(update: Update, result):
+    """Takroriy bosishga asosiy so'rov natijasi bilan javob berish"""
+    text, show_alert = result if isinstance(result, tuple) else (None, False)
+    try:
+        await update.callback_query.answer(text, show_alert=show_alert)
+    except Exception as e:
+        logger.error(f"Takroriy callback javobida xato: {e}")
+
+# Takroriy "Yuklab olish" bosishlarini birlashtirish (scheduler navbatidan oldin)
+download_flight = SingleFlightMiddleware(download_flight_key, answer_duplicate_download)
+dp.update.outer_middleware(download_flight)
+
+# Backpressure: global limit, foydalanuvchi bo'yicha ketma-ketlik, prioritetlar
+scheduler = SchedulerMiddleware(
+    SCHEDULER_MAX_CONCURRENCY, SCHEDULER_MAX_QUEUE, SCHEDULER_SHED_TIMEOUT
+)
+dp.update.outer_middleware(scheduler)
+
+async def check_subscription(user_id: int, channels: list, skip: set) -> tuple[bool, list]:
     """
     Foydalanuvchi obunalarini tekshirish
+    channels - karantindagilarsiz kanallar, skip - tekshirilmaydigan kanallar
+    (so'rov yuborilgan private kanallar va a'zolik keshidagilar, db.get_download_gate dan)
     Returns: (barcha_obuna_bo'ldimi, obuna_bo'lmagan_kanallar)
     """
-    channels = await db.get_channels(bot_id)
     not_subscribed = []
+    confirmed = []
     
     for channel in channels:
+        # So'rov yuborgan (pending/approved) yoki yaqinda tasdiqlangan - API chaqirilmaydi
+        if channel.channel_id in skip:
+            continue
+        
         try:
             member = await bot.get_chat_member(
-                chat_id=channel['channel_id'], 
+                chat_id=channel.channel_id, 
                 user_id=user_id
             )
             
-            if channel['type'] == 'private':
-                # Private kanal: member yoki creator bo'lsa, yoki request yuborgan bo'lsa OK
-                if member.status not in [ChatMemberStatus.MEMBER, ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.CREATOR]:
-                    # Agar restricted yoki left bo'lsa - request yuborgan bo'lishi mumkin
-                    # Biz restricted ni qabul qilamiz (bu request yuborgan degani)
-                    if member.status == ChatMemberStatus.RESTRICTED:
-                        # Request yuborgan, OK
-                        continue
-                    else:
-                        not_subscribed.append(channel)
+            # Member yoki admin bo'lsa OK
+            if member.status not in [ChatMemberStatus.MEMBER, ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.CREATOR]:
+                not_subscribed.append(channel)
             else:
-                # Public kanal: faqat member yoki admin bo'lsa OK
-                if member.status not in [ChatMemberStatus.MEMBER, ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.CREATOR]:
-                    not_subscribed.append(channel)
+                confirmed.append(channel.channel_id)
         
         except Exception as e:
-            logger.error(f"Kanal tekshirishda xato {channel['channel_id']}: {e}")
+            logger.error(f"Kanal tekshirishda xato {channel.channel_id}: {e}")
             not_subscribed.append(channel)
     
+    # Umumiy kesh: boshqa workerlar ham shu foydalanuvchini qayta tekshirmaydi
+    await db.add_memberships(user_id, confirmed)
+    
     return len(not_subscribed) == 0, not_subscribed
 
 @dp.message(CommandStart())
@@ -68,33 +121,130 @@ async def start_handler(message: Message):
     
     await message.answer(MESSAGES['start'])
 
+@dp.chat_join_request()
+async def join_request_handler(request: ChatJoinRequest):
+    """Kanalga qo'shilish so'rovini qayd qilish (keyin fonda tasdiqlanadi)"""
+    # Obuna tekshiruvidagi private kanal bo'lmasa so'rovga tegilmaydi
+    if not await db.add_join_request(request.from_user.id, str(request.chat.id)):
+        logger.debug(f"Qo'shilish so'rovi o'tkazib yuborildi: {request.chat.id} private kanallar ro'yxatida yo'q")
+
+async def approve_join_requests_worker():
+    """Pending so'rovlarni partiyalab, tezlik cheklovi bilan tasdiqlash"""
+    while True:
+        try:
+            pending = await db.get_pending_join_requests(JOIN_APPROVE_BATCH_SIZE)
+            if not pending:
+                await asyncio.sleep(JOIN_APPROVE_IDLE)
+                continue
+            
+            approved, failed = [], []
+            try:
+                for req in pending:
+                    key = (req['user_id'], req['channel_id'])
+                    try:
+                        await bot.approve_chat_join_request(
+                            chat_id=req['channel_id'],
+                            user_id=req['user_id']
+                        )
+                        approved.append(key)
+                    except TelegramRetryAfter as e:
+                        # Flood limit: qolganlari keyingi partiyada
+                        logger.warning(f"Join request flood limit, {e.retry_after}s kutamiz")
+                        await asyncio.sleep(e.retry_after)
+                        break
+                    except (TelegramNetworkError, TelegramServerError) as e:
+                        # Vaqtinchalik xato: so'rov pending qoladi, keyinroq qayta urinamiz
+                        logger.warning(f"Join request vaqtinchalik xato {key}: {e}")
+                        await asyncio.sleep(JOIN_APPROVE_IDLE)
+                        break
+                    except TelegramBadRequest as e:
+                        if "USER_ALREADY_PARTICIPANT" in str(e):
+                            approved.append(key)
+                        else:
+                            logger.error(f"So'rovni tasdiqlashda xato {key}: {e}")
+                            failed.append(key)
+                    except TelegramAPIError as e:
+                        # Forbidden (bot kanaldan chiqarilgan), NotFound va h.k. - navbatni to'smasin
+                        logger.error(f"So'rovni tasdiqlashda xato {key}: {e}")
+                        failed.append(key)
+                    await asyncio.sleep(JOIN_APPROVE_DELAY)
+            finally:
+                # Partiya o'rtasida xato/to'xtatish bo'lsa ham bajarilganlar saqlanadi
+                await db.set_join_requests_status(approved, 'approved')
+                await db.set_join_requests_status(failed, 'failed')
+            if approved:
+                logger.info(f"{len(approved)} ta qo'shilish so'rovi tasdiqlandi")
+        
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Join request worker xato: {e}")
+            await asyncio.sleep(JOIN_APPROVE_IDLE)
+
+async def resolve_download(callback: CallbackQuery, token: Optional[DownloadToken]) -> Optional[tuple]:
+    """
+    Tugma bo'yicha fayl va obuna holati (token None - eski formatdagi tugma)
+    Returns: (file_data, already_downloaded, not_subscribed_channels) yoki None - fayl topilmadi
+    """
+    user_id = callback.from_user.id
+    
+    if token is None:
+        # Eski download_<id> tugma (LEGACY_DOWNLOAD_IDS): bot_id noma'lum - bitta JOIN so'rovi
+        gate = await db.get_download_gate(legacy_file_id(callback.data), user_id)
+        if not gate:
+            return None
+        set_attribute("bot_id", gate.file.bot_id)
+        _, not_subscribed = await check_subscription(
+            user_id, gate.channels, gate.requested | gate.members
+        )
+        return gate.file, gate.downloaded, not_subscribed
+    
+    # Imzolangan token: bot_id ma'lum - obuna tekshiruvi fayl qatori o'qilishi bilan parallel
+    set_attribute("bot_id", token.bot_id)
+    file_task = asyncio.create_task(db.get_file_for_user(token.file_db_id, user_id))
+    try:
+        gate = await db.get_channel_gate(token.bot_id, user_id)
+        _, not_subscribed = await check_subscription(
+            user_id, gate.channels, gate.requested | gate.members
+        )
+    except BaseException:
+        file_task.cancel()
+        raise
+    
+    file_row = await file_task
+    # Fayl o'chirilgan (yoki ID boshqa botning fayliga tegishli)
+    if not file_row or file_row[0].bot_id != token.bot_id:
+        return None
+    return (*file_row, not_subscribed)
+
+async def answer_download(callback: CallbackQuery, text: str = None, show_alert: bool = False):
+    """Callback'ga javob berish; natija takroriy bosishlar uchun qaytariladi"""
+    await callback.answer(text, show_alert=show_alert)
+    return text, show_alert
+
 @dp.callback_query(F.data.startswith("download_"))
 async def download_handler(callback: CallbackQuery):
     """Yuklab olish tugmasi bosilganda"""
     try:
-        # File ID ni olish
-        file_db_id = int(callback.data.split("_")[1])
+        # Imzoni tekshirish - soxta tugma uchun DB/API ga murojaat qilinmaydi
+        token = decode_download_token(callback.data)
+        if token is None and not (LEGACY_DOWNLOAD_IDS and legacy_file_id(callback.data)):
+            return await answer_download(callback, "❌ Noto'g'ri tugma!", show_alert=True)
+        set_attribute("file_id", token.file_db_id if token else legacy_file_id(callback.data))
         
-        # Faylni topish
-        file_data = await db.get_file(file_db_id)
-        if not file_data:
-            await callback.answer("❌ Fayl topilmadi!", show_alert=True)
-            return
+        # Fayl, kanallar, so'rovlar va oldingi yuklab olish
+        resolved = await resolve_download(callback, token)
+        if not resolved:
+            return await answer_download(callback, "❌ Fayl topilmadi!", show_alert=True)
         
-        bot_id = file_data['bot_id']
+        file_data, already_downloaded, not_subscribed_channels = resolved
         
-        # Obunani tekshirish
-        is_subscribed, not_subscribed_channels = await check_subscription(
-            callback.from_user.id, 
-            bot_id
-        )
-        
-        if not is_subscribed:
+        if not_subscribed_channels:
             # Obuna bo'lmagan
             text = MESSAGES['not_subscribed']
             for channel in not_subscribed_channels:
-                type_text = "🔒 Private" if channel['type'] == 'private' else "📢 Public"
-                text += f"\n{type_text}: {channel['title']}"
+                type_text = "🔒 Private" if channel.type == 'private' else "📢 Public"
+                text += f"\n{type_text}: {channel.title}"
             
             text += "\n\n⚠️ Barcha kanallarga obuna bo'ling yoki so'rov yuboring!"
             
@@ -102,48 +252,44 @@ async def download_handler(callback: CallbackQuery):
                 text=text,
                 reply_markup=get_channel_buttons(not_subscribed_channels)
             )
-            await callback.answer()
-            return
-        
-        # Allaqachon yuklab olganmi?
-        already_downloaded = await db.check_downloaded(callback.from_user.id, file_db_id)
+            return await answer_download(callback)
         
         # Faylni yuborish
         try:
-            if file_data['file_type'] == 'video':
+            if file_data.file_type == 'video':
                 await callback.message.answer_video(
-                    video=file_data['file_id'],
+                    video=file_data.file_id,
                     caption=MESSAGES['file_sent']
                 )
-            elif file_data['file_type'] == 'document':
+            elif file_data.file_type == 'document':
                 await callback.message.answer_document(
-                    document=file_data['file_id'],
+                    document=file_data.file_id,
                     caption=MESSAGES['file_sent']
                 )
-            elif file_data['file_type'] == 'photo':
+            elif file_data.file_type == 'photo':
                 await callback.message.answer_photo(
-                    photo=file_data['file_id'],
+                    photo=file_data.file_id,
                     caption=MESSAGES['file_sent']
                 )
-            elif file_data['file_type'] == 'audio':
+            elif file_data.file_type == 'audio':
                 await callback.message.answer_audio(
-                    audio=file_data['file_id'],
+                    audio=file_data.file_id,
                     caption=MESSAGES['file_sent']
                 )
             
             # Yuklab olishni qayd qilish (faqat birinchi marta)
             if not already_downloaded:
-                await db.add_download(callback.from_user.id, file_db_id)
+                await db.add_download(callback.from_user.id, file_data.id)
             
-            await callback.answer("✅ Fayl yuborildi!", show_alert=True)
+            return await answer_download(callback, "✅ Fayl yuborildi!", show_alert=True)
             
         except Exception as e:
             logger.error(f"Fayl yuborishda xato: {e}")
-            await callback.answer("❌ Faylni yuborishda xatolik!", show_alert=True)
+            return await answer_download(callback, "❌ Faylni yuborishda xatolik!", show_alert=True)
     
     except Exception as e:
         logger.error(f"Download handler xato: {e}")
-        await callback.answer(MESSAGES['error'], show_alert=True)
+        return await answer_download(callback, MESSAGES['error'], show_alert=True)
 
 @dp.callback_query(F.data == "check_sub")
 async def check_subscription_handler(callback: CallbackQuery):
@@ -160,17 +306,50 @@ async def check_subscription_handler(callback: CallbackQuery):
         logger.error(f"Check subscription xato: {e}")
         await callback.answer(MESSAGES['error'], show_alert=True)
 
+async def startup(approve_requests: bool = True) -> list:
+    """
+    DB, profil keshi va fon vazifalari (main() va workers.py dagi har bir worker uchun)
+    Returns: fon vazifalari (shutdown() ga beriladi)
+    """
+    setup_tracing()
+    await db.init_db()
+    owns = None
+    if WORKER_INDEX:
+        # Supervisor bilan bir xil hash ring - faqat shu workerga keladigan foydalanuvchilar
+        from workers import HashRing
+        ring, index = HashRing(WORKERS), int(WORKER_INDEX)
+        owns = lambda user_id: ring.get(user_id) == index
+    warmed = await db.warm_user_cache(owns)
+    logger.info(f"Profil keshi: {warmed} ta foydalanuvchi yuklandi")
+    
+    tasks = [asyncio.create_task(scheduler.log_metrics(SCHEDULER_METRICS_INTERVAL))]
+    # Qo'shilish so'rovlarini fonda tasdiqlash (bir nechta jarayonda - faqat bittasida)
+    if approve_requests:
+        tasks.append(asyncio.create_task(approve_join_requests_worker()))
+    return tasks
+
+async def shutdown(tasks: list):
+    """Fon vazifalarini to'xtatish va resurslarni yopish"""
+    for task in tasks:
+        task.cancel()
+    await close_session()
+    shutdown_tracing()
+    if recorder:
+        recorder.stop()
+
 async def main():
     """Botni ishga tushirish"""
-    # Database initsializatsiya
-    await db.init_db()
+    tasks = await startup()
     
     # Bot haqida ma'lumot
     bot_info = await bot.get_me()
     logger.info(f"User bot ishga tushdi: @{bot_info.username}")
     
-    # Polling boshlash
-    await dp.start_polling(bot)
+    # Polling boshlash (chat_join_request ham ishlatilgan update turlaridan olinadi)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        await shutdown(tasks)
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
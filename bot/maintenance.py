@@ -0,0 +1,110 @@
+import asyncio
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import sys
+
+from config import (
+    DATABASE_NAME, DOWNLOADS_RETENTION_DAYS, ARCHIVE_DIR,
+    ARCHIVE_BATCH_SIZE, MAINTENANCE_INTERVAL, VACUUM_PAGES_PER_STEP
+)
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+# Partiyalar/qadamlar orasidagi pauza - bot handlerlari DB ga kira olishi uchun
+STEP_PAUSE = 0.2
+
+def write_archive(rows: list) -> None:
+    """Qatorlarni oylik gzip JSONL fayllarga qo'shish (downloads-YYYY-MM.jsonl.gz)"""
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    by_month = {}
+    for row in rows:
+        by_month.setdefault(str(row['downloaded_at'])[:7], []).append(row)
+
+    for month, month_rows in by_month.items():
+        path = os.path.join(ARCHIVE_DIR, f"downloads-{month}.jsonl.gz")
+        # "ab" - yangi gzip member qo'shiladi, fayl baribir bitta oqim sifatida o'qiladi
+        with gzip.open(path, "ab") as f:
+            for row in month_rows:
+                f.write(json.dumps(row, ensure_ascii=False).encode("utf-8") + b"\n")
+
+async def archive_old_downloads(db: Database) -> int:
+    """
+    Eski yuklab olishlarni partiyalab arxivga ko'chirish
+    Avval fayl yoziladi, keyin qatorlar o'chiriladi: uzilish bo'lsa qator
+    arxivda ikki marta bo'lishi mumkin, lekin yo'qolmaydi.
+    Returns: arxivlangan qatorlar soni
+    """
+    total = 0
+    while True:
+        rows = await db.get_old_downloads(DOWNLOADS_RETENTION_DAYS, ARCHIVE_BATCH_SIZE)
+        if not rows:
+            break
+
+        await asyncio.to_thread(write_archive, rows)
+        await db.delete_archived_downloads(rows)
+        total += len(rows)
+
+        if len(rows) < ARCHIVE_BATCH_SIZE:
+            break
+        await asyncio.sleep(STEP_PAUSE)
+
+    return total
+
+async def compact(db: Database) -> None:
+    """Bo'sh sahifalarni kichik qadamlar bilan bo'shatish va PRAGMA optimize"""
+    if await db.get_auto_vacuum_mode() == 2:
+        while await db.incremental_vacuum(VACUUM_PAGES_PER_STEP) > 0:
+            await asyncio.sleep(STEP_PAUSE)
+    await db.optimize()
+
+async def maintenance_worker(db: Database):
+    """Davriy texnik xizmat: arxivlash, eskirgan kesh tozalash, siqish"""
+    if await db.get_auto_vacuum_mode() != 2:
+        logger.warning(
+            "auto_vacuum=INCREMENTAL yoqilmagan, DB fayli kichraymaydi. "
+            "Botlar to'xtatilgan holda bir marta ishga tushiring: "
+            "python maintenance.py --enable-incremental-vacuum"
+        )
+
+    while True:
+        try:
+            archived = await archive_old_downloads(db)
+            if archived:
+                logger.info(f"{archived} ta yuklab olish arxivlandi")
+            await db.prune_memberships()
+            await compact(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Texnik xizmat xato: {e}")
+
+        await asyncio.sleep(MAINTENANCE_INTERVAL)
+
+def enable_incremental_vacuum(db_name: str) -> None:
+    """auto_vacuum=INCREMENTAL ni yoqish (to'liq VACUUM, botlar to'xtatilgan holda)"""
+    conn = sqlite3.connect(db_name)
+    try:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if "--enable-incremental-vacuum" in sys.argv:
+        enable_incremental_vacuum(DATABASE_NAME)
+        logger.info("auto_vacuum=INCREMENTAL yoqildi")
+    else:
+        async def run_once():
+            db = Database(DATABASE_NAME)
+            await db.init_db()
+            archived = await archive_old_downloads(db)
+            await db.prune_memberships()
+            await compact(db)
+            logger.info(f"{archived} ta yuklab olish arxivlandi")
+
+        asyncio.run(run_once())
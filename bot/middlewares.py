@@ -0,0 +1,226 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+logger = logging.getLogger(__name__)
+
+# Prioritetlar: kichik son - yuqori prioritet
+PRIORITY_CALLBACK = 0
+PRIORITY_DEFAULT = 1
+PRIORITY_START = 2
+
+def get_update_priority(update: Update) -> int:
+    """Update prioriteti: callback > boshqa xabarlar > /start"""
+    if update.callback_query:
+        return PRIORITY_CALLBACK
+    if update.message and update.message.text and update.message.text.startswith("/start"):
+        return PRIORITY_START
+    return PRIORITY_DEFAULT
+
+class PriorityLimiter:
+    """
+    Prioritetli semafor: bo'sh slot eng yuqori prioritetli (keyin eng eski)
+    kutuvchiga beriladi.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.in_flight = 0
+        self.queued = 0
+        self._waiters = []  # heap: (priority, seq, future)
+        self._seq = itertools.count()
+
+    def queued_by_priority(self) -> Dict[int, int]:
+        counts = {}
+        for priority, _, fut in self._waiters:
+            if not fut.done():
+                counts[priority] = counts.get(priority, 0) + 1
+        return counts
+
+    async def acquire(self, priority: int, timeout: float = None) -> bool:
+        """Slot olish. timeout tugasa False qaytaradi"""
+        if self.in_flight < self.capacity and not self.queued:
+            self.in_flight += 1
+            return True
+
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        self.queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), timeout)
+            return True
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if fut.done():
+                # Slot aynan hozir berildi - qaytaramiz
+                self.release()
+            else:
+                self.queued -= 1
+                fut.cancel()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return False
+
+    def release(self):
+        """Slotni bo'shatish va keyingi kutuvchiga berish"""
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                # Slot to'g'ridan-to'g'ri uzatiladi, in_flight o'zgarmaydi
+                self.queued -= 1
+                fut.set_result(None)
+                return
+        self.in_flight -= 1
+
+class SchedulerMiddleware(BaseMiddleware):
+    """
+    Update'larni rejalashtirish (dp.update.outer_middleware):
+    - global parallel ishlov berish chegarasi
+    - bitta foydalanuvchi update'lari ketma-ket
+    - callback'lar /start dan oldin
+    - navbat to'lganda past prioritetli update'lar tashlab yuboriladi
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, shed_timeout: float):
+        self.limiter = PriorityLimiter(max_concurrency)
+        self.max_queue = max_queue
+        self.shed_timeout = shed_timeout
+        self._user_locks: Dict[int, list] = {}  # user_id -> [lock, shu foydalanuvchining update'lari soni]
+        self.processed = 0
+        self.shed = 0
+        self.max_wait = 0.0
+
+    async def log_metrics(self, interval: int):
+        """Metrikalarni davriy log qilish (fon vazifasi)"""
+        while True:
+            await asyncio.sleep(interval)
+            logger.info(f"Scheduler: {self.metrics()}")
+
+    def metrics(self) -> Dict[str, Any]:
+        """Navbat metrikalari"""
+        return {
+            'in_flight': self.limiter.in_flight,
+            'queued': self.limiter.queued,
+            'queued_by_priority': self.limiter.queued_by_priority(),
+            'active_users': len(self._user_locks),
+            'processed': self.processed,
+            'shed': self.shed,
+            'max_wait': round(self.max_wait, 3),
+        }
+
+    def _shed(self, priority: int, reason: str) -> None:
+        self.shed += 1
+        logger.warning(f"Update tashlab yuborildi (prioritet={priority}): {reason}")
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        priority = get_update_priority(event)
+        # Past prioritetli ishlar uchun kutish chegarasi
+        timeout = self.shed_timeout if priority == PRIORITY_START else None
+
+        if priority == PRIORITY_START and self.limiter.queued >= self.max_queue:
+            self._shed(priority, "navbat to'la")
+            return None
+
+        user = data.get("event_from_user")
+        user_id = user.id if user else None
+        started = time.monotonic()
+
+        entry = None
+        if user_id is not None:
+            entry = self._user_locks.setdefault(user_id, [asyncio.Lock(), 0])
+            entry[1] += 1
+        try:
+            if entry:
+                try:
+                    await asyncio.wait_for(entry[0].acquire(), timeout)
+                except asyncio.TimeoutError:
+                    self._shed(priority, "foydalanuvchi navbati")
+                    return None
+            try:
+                remaining = None if timeout is None else max(0.0, timeout - (time.monotonic() - started))
+                if not await self.limiter.acquire(priority, remaining):
+                    self._shed(priority, "kutish vaqti tugadi")
+                    return None
+
+                self.max_wait = max(self.max_wait, time.monotonic() - started)
+                try:
+                    return await handler(event, data)
+                finally:
+                    self.processed += 1
+                    self.limiter.release()
+            finally:
+                if entry:
+                    entry[0].release()
+        finally:
+            if entry:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    self._user_locks.pop(user_id, None)
+
+class SingleFlightMiddleware(BaseMiddleware):
+    """
+    Bir xil kalitli update'larni birlashtirish (dp.update.outer_middleware):
+    kalit bo'yicha so'rov bajarilayotgan bo'lsa, takroriy update handlerga
+    yetib bormaydi - asosiy so'rov natijasini kutadi va on_duplicate chaqiriladi.
+    """
+
+    def __init__(
+        self,
+        key_func: Callable[[Update], Optional[Hashable]],
+        on_duplicate: Callable[[Update, Any], Awaitable[None]],
+    ):
+        self.key_func = key_func
+        self.on_duplicate = on_duplicate
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+        self.coalesced = 0
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        key = self.key_func(event)
+        if key is None:
+            return await handler(event, data)
+
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            try:
+                result = await asyncio.shield(flight)
+            except asyncio.CancelledError:
+                if not flight.cancelled():
+                    raise
+                result = None
+            except Exception:
+                result = None
+            await self.on_duplicate(event, result)
+            return result
+
+        flight = asyncio.get_running_loop().create_future()
+        self._flights[key] = flight
+        try:
+            result = await handler(event, data)
+            flight.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except Exception as e:
+            flight.set_exception(e)
+            # Kutuvchi bo'lmasa "exception was never retrieved" chiqmasligi uchun
+            flight.exception()
+            raise
+        finally:
+            self._flights.pop(key, None)
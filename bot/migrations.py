@@ -0,0 +1,247 @@
+import logging
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+# Boshqa jarayon (admin/user bot) migratsiya qilayotgan bo'lsa kutish vaqti (s)
+LOCK_TIMEOUT = 60
+
+# Migratsiyalar ro'yxati: (versiya, tavsif, SQL buyruqlar)
+# Versiyalar ketma-ket o'sib borishi SHART. Qo'llangan migratsiyani o'zgartirmang -
+# yangi o'zgarish uchun yangi versiya qo'shing.
+# Har bir migratsiya alohida tranzaksiyada bajariladi, shuning uchun katta
+# jadvallarga indeks qo'shishni alohida migratsiyaga ajrating: yozish qulfi faqat
+# shu indeks qurilishi davomida ushlanadi, boshqa jarayon esa busy timeout bilan kutadi.
+MIGRATIONS = [
+    (1, "boshlang'ich sxema", [
+        """
+        CREATE TABLE IF NOT EXISTS bots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            token TEXT UNIQUE NOT NULL,
+            name TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS channels (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            bot_id INTEGER NOT NULL,
+            channel_id TEXT NOT NULL,
+            username TEXT,
+            title TEXT,
+            type TEXT NOT NULL,
+            invite_link TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (bot_id) REFERENCES bots (id) ON DELETE CASCADE,
+            UNIQUE(bot_id, channel_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT,
+            first_name TEXT,
+            last_name TEXT,
+            first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS files (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            bot_id INTEGER NOT NULL,
+            file_id TEXT NOT NULL,
+            file_type TEXT NOT NULL,
+            file_name TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (bot_id) REFERENCES bots (id) ON DELETE CASCADE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS downloads (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            file_id INTEGER NOT NULL,
+            downloaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (user_id),
+            FOREIGN KEY (file_id) REFERENCES files (id)
+        )
+        """,
+    ]),
+    (2, "kanalga qo'shilish so'rovlari", [
+        """
+        CREATE TABLE IF NOT EXISTS join_requests (
+            user_id INTEGER NOT NULL,
+            channel_id TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            requested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            processed_at TIMESTAMP,
+            PRIMARY KEY (user_id, channel_id)
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_join_requests_status
+        ON join_requests (status, requested_at)
+        """,
+    ]),
+    (3, "downloads (user_id, file_id) indeksi", [
+        """
+        CREATE INDEX IF NOT EXISTS idx_downloads_user_file
+        ON downloads (user_id, file_id)
+        """,
+    ]),
+    (4, "channels (bot_id, created_at) indeksi", [
+        """
+        CREATE INDEX IF NOT EXISTS idx_channels_bot_created
+        ON channels (bot_id, created_at)
+        """,
+    ]),
+    (5, "files (bot_id) indeksi", [
+        """
+        CREATE INDEX IF NOT EXISTS idx_files_bot
+        ON files (bot_id)
+        """,
+    ]),
+    (6, "arxivlangan yuklab olishlar hisoblagichi", [
+        """
+        CREATE TABLE IF NOT EXISTS download_archive_counts (
+            month TEXT PRIMARY KEY,
+            downloads INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        # Arxivlangan (user_id, file_id) juftlari - qayta yuklab olish hisobga qo'shilmasin
+        """
+        CREATE TABLE IF NOT EXISTS archived_downloads (
+            user_id INTEGER NOT NULL,
+            file_id INTEGER NOT NULL,
+            PRIMARY KEY (user_id, file_id)
+        ) WITHOUT ROWID
+        """,
+    ]),
+    (7, "downloads (downloaded_at) indeksi", [
+        """
+        CREATE INDEX IF NOT EXISTS idx_downloads_downloaded_at
+        ON downloads (downloaded_at)
+        """,
+    ]),
+    (8, "bots (created_at) indeksi", [
+        """
+        CREATE INDEX IF NOT EXISTS idx_bots_created
+        ON bots (created_at)
+        """,
+    ]),
+    (9, "bots/channels hisoblagichlari", [
+        """
+        CREATE TABLE IF NOT EXISTS counters (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        """
+        INSERT OR REPLACE INTO counters (key, value)
+        SELECT 'bots', COUNT(*) FROM bots
+        """,
+        """
+        INSERT OR REPLACE INTO counters (key, value)
+        SELECT 'channels:' || bot_id, COUNT(*) FROM channels GROUP BY bot_id
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_bots_count_insert AFTER INSERT ON bots
+        BEGIN
+            INSERT INTO counters (key, value) VALUES ('bots', 1)
+            ON CONFLICT(key) DO UPDATE SET value = value + 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_bots_count_delete AFTER DELETE ON bots
+        BEGIN
+            UPDATE counters SET value = value - 1 WHERE key = 'bots';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_channels_count_insert AFTER INSERT ON channels
+        BEGIN
+            INSERT INTO counters (key, value) VALUES ('channels:' || NEW.bot_id, 1)
+            ON CONFLICT(key) DO UPDATE SET value = value + 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_channels_count_delete AFTER DELETE ON channels
+        BEGIN
+            UPDATE counters SET value = value - 1 WHERE key = 'channels:' || OLD.bot_id;
+        END
+        """,
+    ]),
+    (10, "kanal holati (karantin)", [
+        "ALTER TABLE channels ADD COLUMN quarantined INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE channels ADD COLUMN quarantine_reason TEXT",
+        "ALTER TABLE channels ADD COLUMN checked_at TIMESTAMP",
+    ]),
+    (11, "a'zolik keshi (workerlar uchun umumiy)", [
+        # expires_at - TTL ga bog'liq bo'lmagan tozalash (prune_memberships)
+        """
+        CREATE TABLE IF NOT EXISTS memberships (
+            user_id INTEGER NOT NULL,
+            channel_id TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            PRIMARY KEY (user_id, channel_id)
+        ) WITHOUT ROWID
+        """,
+    ]),
+    (12, "users (first_seen) indeksi", [
+        # warm_user_cache: eng yangi foydalanuvchilar - saralashsiz, indeks bo'yicha
+        """
+        CREATE INDEX IF NOT EXISTS idx_users_first_seen
+        ON users (first_seen)
+        """,
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+async def get_version(db: aiosqlite.Connection) -> int:
+    """Joriy sxema versiyasi (PRAGMA user_version)"""
+    cursor = await db.execute("PRAGMA user_version")
+    row = await cursor.fetchone()
+    return row[0] if row else 0
+
+async def migrate(db_name: str) -> int:
+    """
+    Bajarilmagan migratsiyalarni tartib bilan qo'llash
+    Sxema allaqachon yangi bo'lsa - bitta PRAGMA o'qish bilan qaytadi.
+    Returns: yakuniy sxema versiyasi
+    """
+    # isolation_level=None - tranzaksiyalarni o'zimiz boshqaramiz
+    async with aiosqlite.connect(db_name, timeout=LOCK_TIMEOUT, isolation_level=None) as db:
+        # WAL: o'quvchilar (eksport, boshqa jarayon) yozuvchilarni bloklamaydi.
+        # Rejim DB faylida saqlanadi; tranzaksiyadan tashqarida bajarilishi shart.
+        await db.execute("PRAGMA journal_mode = WAL")
+        version = await get_version(db)
+        if version >= LATEST_VERSION:
+            return version
+
+        for target, description, statements in MIGRATIONS:
+            if target <= version:
+                continue
+
+            # BEGIN IMMEDIATE - yozish qulfi; ikkinchi jarayon shu yerda kutadi
+            await db.execute("BEGIN IMMEDIATE")
+            try:
+                # Qulfni kutayotganda boshqa jarayon qo'llagan bo'lishi mumkin
+                version = await get_version(db)
+                if target <= version:
+                    await db.execute("COMMIT")
+                    continue
+
+                for sql in statements:
+                    await db.execute(sql)
+                await db.execute(f"PRAGMA user_version = {int(target)}")
+                await db.execute("COMMIT")
+            except Exception:
+                await db.execute("ROLLBACK")
+                logger.error(f"Migratsiya {target} ({description}) bajarilmadi")
+                raise
+
+            version = target
+            logger.info(f"Migratsiya {target} qo'llandi: {description}")
+
+        return version
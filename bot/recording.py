@@ -0,0 +1,118 @@
+import hashlib
+import hmac
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from config import (
+    ADMIN_ID, WORKER_INDEX, RECORD_UPDATES, RECORD_DIR, RECORD_MAX_BYTES, RECORD_BACKUP_COUNT, RECORD_SALT
+)
+
+# Shaxsiy ma'lumot bo'lgan maydonlar - yozuvdan butunlay olib tashlanadi
+DROP_FIELDS = {
+    "username", "last_name", "language_code", "phone_number", "contact",
+    "location", "venue", "bio", "entities", "caption_entities", "email",
+    # chat_join_request.invite_link - private kanalning taklif havolasi
+    "invite_link",
+}
+# Matn maydonlari: komandalar (/start ...) saqlanadi, qolgani uzunligi bo'yicha niqoblanadi
+TEXT_FIELDS = {"text", "caption"}
+# Foydalanuvchi ID si bo'lgan alohida maydonlar (masalan chat_join_request.user_chat_id)
+def is_user_id_field(key: str) -> bool:
+    return key == "user_chat_id" or key == "user_id" or key.endswith("_user_id")
+
+_salt = (RECORD_SALT or os.urandom(16).hex()).encode()
+
+def pseudonymize(user_id: int) -> int:
+    """Foydalanuvchi ID sini barqaror taxallusga almashtirish (ADMIN_ID o'zgarmaydi)"""
+    if user_id == ADMIN_ID:
+        return user_id
+    digest = hmac.new(_salt, str(user_id).encode(), hashlib.sha256).digest()
+    # 48 bit - Telegram user ID oralig'iga mos musbat son
+    return int.from_bytes(digest[:6], "big") or 1
+
+def scrub(value: Any) -> Any:
+    """Update JSON idan shaxsiy ma'lumotlarni tozalash (tuzilma saqlanadi)"""
+    if isinstance(value, list):
+        return [scrub(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+
+    result = {}
+    # User (is_bot bor) yoki shaxsiy chat - ID taxallus, ism niqoblanadi
+    is_person = "is_bot" in value or value.get("type") == "private"
+    for key, item in value.items():
+        if key in DROP_FIELDS:
+            continue
+        if is_person and key == "id":
+            result[key] = pseudonymize(item)
+        elif is_user_id_field(key) and isinstance(item, int):
+            result[key] = pseudonymize(item)
+        elif is_person and key == "first_name":
+            result[key] = "user"
+        elif key in TEXT_FIELDS and isinstance(item, str):
+            result[key] = item if item.startswith("/") else "x" * len(item)
+        else:
+            result[key] = scrub(item)
+    return result
+
+class RecorderMiddleware(BaseMiddleware):
+    """
+    Kiruvchi update'larni (PII tozalangan) aylanuvchi JSONL faylga yozish
+    dp.update.outer_middleware - birinchi bo'lib ro'yxatdan o'tkaziladi.
+    Yozish QueueHandler orqali fon threadda bajariladi.
+    """
+
+    def __init__(self, name: str):
+        os.makedirs(RECORD_DIR, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            os.path.join(RECORD_DIR, f"{name}.jsonl"),
+            maxBytes=RECORD_MAX_BYTES, backupCount=RECORD_BACKUP_COUNT, encoding="utf-8"
+        )
+        file_handler.setFormatter(logging.Formatter("%(message)s"))
+        log_queue = queue.SimpleQueue()
+
+        self._logger = logging.getLogger(f"recording.{name}")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self._logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        self._listener = logging.handlers.QueueListener(log_queue, file_handler)
+        self._listener.start()
+
+    def stop(self) -> None:
+        """Navbatdagi yozuvlarni faylga yozib, fon threadni to'xtatish"""
+        self._listener.stop()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        try:
+            record = {
+                "t": round(time.time(), 3),
+                "update": scrub(event.model_dump(mode="json", exclude_none=True, by_alias=True)),
+            }
+            self._logger.info(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+        except Exception as e:
+            logging.getLogger(__name__).error(f"Update yozishda xato: {e}")
+        return await handler(event, data)
+
+def setup_recording(dp, name: str) -> Optional[RecorderMiddleware]:
+    """RECORD_UPDATES yoqilgan bo'lsa recorder ni dispatcherga ulash"""
+    if not RECORD_UPDATES:
+        return None
+    # workers.py: har bir worker o'z fayliga yozadi (replay.py fayllarni vaqt bo'yicha birlashtiradi)
+    if WORKER_INDEX:
+        name = f"{name}.{WORKER_INDEX}"
+    recorder = RecorderMiddleware(name)
+    dp.update.outer_middleware(recorder)
+    return recorder
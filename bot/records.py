@@ -0,0 +1,54 @@
+from typing import List, NamedTuple, Optional, Set
+
+# Database o'qishlari natijalari: dict o'rniga tuple asosidagi yozuvlar.
+# Maydonlar tartibi SELECT dagi ustunlar tartibi bilan bir xil (*_COLUMNS).
+
+class BotRecord(NamedTuple):
+    id: int
+    token: str
+    name: str
+    created_at: str
+
+class ChannelRecord(NamedTuple):
+    id: int
+    bot_id: int
+    channel_id: str
+    username: Optional[str]
+    title: Optional[str]
+    type: str
+    invite_link: Optional[str]
+    created_at: str
+    quarantined: int
+    quarantine_reason: Optional[str]
+    checked_at: Optional[str]
+
+class FileRecord(NamedTuple):
+    id: int
+    bot_id: int
+    file_id: str
+    file_type: str
+    file_name: Optional[str]
+    created_at: str
+
+class DownloadGate(NamedTuple):
+    """Yuklab olish tekshiruvi uchun hamma narsa - bitta so'rov natijasi"""
+    file: FileRecord
+    channels: List[ChannelRecord]  # karantindagilarsiz
+    requested: Set[str]            # so'rov yuborilgan private kanallar
+    members: Set[str]              # a'zolik keshida (MEMBERSHIP_CACHE_TTL ichida) tasdiqlangan
+    downloaded: bool               # foydalanuvchi avval yuklab olganmi
+
+class ChannelGate(NamedTuple):
+    """Bot kanallari bo'yicha foydalanuvchi holati (bot_id imzolangan tokendan ma'lum bo'lganda)"""
+    channels: List[ChannelRecord]
+    requested: Set[str]
+    members: Set[str]
+
+BOT_COLUMNS = ", ".join(BotRecord._fields)
+CHANNEL_COLUMNS = ", ".join(ChannelRecord._fields)
+FILE_COLUMNS = ", ".join(FileRecord._fields)
+
+def record_factory(record_cls):
+    """sqlite3 row_factory: qatordan to'g'ridan-to'g'ri yozuv yaratish"""
+    make = record_cls._make
+    return lambda cursor, row: make(row)
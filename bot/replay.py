@@ -0,0 +1,159 @@
+"""
+Yozib olingan update'larni dispatcherga qayta berish (regression benchmark)
+
+    python replay.py recordings/user.jsonl --db copy_of_bot_database.db --speed 10
+    python replay.py recordings/admin.jsonl --target admin --speed max
+
+Bot API o'rniga lokal mock server ishlatiladi; natijada update turlari
+bo'yicha kechikish taqsimoti (p50/p90/p99/max) chiqariladi.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, List
+
+from aiohttp import web
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import Update
+
+MOCK_USER = {"id": 1, "is_bot": True, "first_name": "mock", "username": "mock_bot"}
+MOCK_MESSAGE = {"message_id": 1, "date": 0, "chat": {"id": 1, "type": "private", "first_name": "user"}}
+
+def mock_result(method: str, member_status: str):
+    """Bot API metodi uchun soxta natija"""
+    method = method.lower()
+    if method == "getme":
+        return MOCK_USER
+    if method == "getchatmember":
+        return {"status": member_status, "user": MOCK_USER}
+    if method == "getchat":
+        return {"id": -1001, "type": "channel", "title": "mock"}
+    if method == "createchatinvitelink":
+        return {
+            "invite_link": "https://t.me/+mock", "creator": MOCK_USER,
+            "creates_join_request": True, "is_primary": False, "is_revoked": False,
+        }
+    if method == "exportchatinvitelink":
+        return "https://t.me/+mock"
+    if method.startswith("send") or method.startswith("edit"):
+        return MOCK_MESSAGE
+    return True
+
+async def start_mock_api(port: int, latency: float, member_status: str) -> web.AppRunner:
+    """Lokal mock Bot API serverini ishga tushirish"""
+    async def handle(request: web.Request) -> web.Response:
+        if latency:
+            await asyncio.sleep(latency)
+        return web.json_response({
+            "ok": True,
+            "result": mock_result(request.match_info["method"], member_status),
+        })
+
+    app = web.Application()
+    app.router.add_route("*", "/bot{token}/{method}", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+def update_kind(update: Dict) -> str:
+    """Hisobot uchun update turi"""
+    if "callback_query" in update:
+        data = update["callback_query"].get("data", "")
+        return f"callback:{data.split('_')[0]}"
+    if "message" in update:
+        text = update["message"].get("text", "")
+        return text.split()[0] if text.startswith("/") else "message"
+    return next((k for k in update if k != "update_id"), "unknown")
+
+def percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(p / 100 * len(values)) - 1))
+    return values[index]
+
+def load_recording(paths: List[str]) -> List[Dict]:
+    records = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    records.append(json.loads(line))
+    records.sort(key=lambda r: r["t"])
+    return records
+
+async def replay(args) -> None:
+    if args.target == "admin":
+        import admin as app
+    else:
+        import main as app
+
+    # Nusxa DB va mock API (umumiy HTTP sessiya - barcha Bot obyektlari uchun)
+    app.db.db_name = args.db
+    await app.db.init_db()
+    app.bot.session.api = TelegramAPIServer.from_base(f"http://127.0.0.1:{args.port}")
+    runner = await start_mock_api(args.port, args.api_latency / 1000, args.member_status)
+
+    records = load_recording(args.files)
+    if args.limit:
+        records = records[:args.limit]
+    speed = None if args.speed == "max" else float(args.speed)
+
+    latencies: Dict[str, List[float]] = {}
+    errors = 0
+
+    async def process(record: Dict):
+        nonlocal errors
+        update = Update.model_validate(record["update"], context={"bot": app.bot})
+        started = time.perf_counter()
+        try:
+            await app.dp.feed_update(app.bot, update)
+        except Exception:
+            errors += 1
+        latencies.setdefault(update_kind(record["update"]), []).append(
+            (time.perf_counter() - started) * 1000
+        )
+
+    # Polling kabi: har bir update alohida task, asl vaqt oralig'i speed ga bo'linadi
+    first_t = records[0]["t"] if records else 0
+    replay_start = time.perf_counter()
+    tasks = []
+    for record in records:
+        if speed:
+            delay = (record["t"] - first_t) / speed - (time.perf_counter() - replay_start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(process(record)))
+    await asyncio.gather(*tasks)
+    total = time.perf_counter() - replay_start
+
+    await runner.cleanup()
+    await app.close_session()
+
+    print(f"Update'lar: {len(records)}, xatolar: {errors}, vaqt: {total:.2f}s, "
+          f"tezlik: {len(records) / total if total else 0:.1f} upd/s\n")
+    print(f"{'tur':<24} {'soni':>7} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}  (ms)")
+    all_values = []
+    for kind, values in sorted(latencies.items()):
+        all_values.extend(values)
+        print(f"{kind:<24} {len(values):>7} {percentile(values, 50):>9.1f} "
+              f"{percentile(values, 90):>9.1f} {percentile(values, 99):>9.1f} {max(values):>9.1f}")
+    if all_values:
+        print(f"{'JAMI':<24} {len(all_values):>7} {percentile(all_values, 50):>9.1f} "
+              f"{percentile(all_values, 90):>9.1f} {percentile(all_values, 99):>9.1f} {max(all_values):>9.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Yozib olingan update'larni qayta berish")
+    parser.add_argument("files", nargs="+", help="recorder JSONL fayllari")
+    parser.add_argument("--target", choices=["main", "admin"], default="main", help="qaysi dispatcher")
+    parser.add_argument("--db", required=True, help="DB nusxasi (asl bazani ishlatmang!)")
+    parser.add_argument("--speed", default="1", help="1, 10 (10x) yoki max")
+    parser.add_argument("--port", type=int, default=8081, help="mock Bot API porti")
+    parser.add_argument("--api-latency", type=float, default=30, help="mock API kechikishi (ms)")
+    parser.add_argument("--member-status", default="member", help="getChatMember natijasi")
+    parser.add_argument("--limit", type=int, default=0, help="faqat birinchi N ta update")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(replay(args))
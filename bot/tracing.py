@@ -0,0 +1,240 @@
+import argparse
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.types import TelegramObject, Update
+
+from config import TRACE_SAMPLE_RATE, TRACE_FILE, TRACE_MAX_BYTES, TRACE_BACKUP_COUNT, WORKER_INDEX
+
+# Joriy span (har bir asyncio task o'z kontekstiga ega)
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+# Trace'lar alohida logger orqali yoziladi: QueueHandler -> fon thread -> RotatingFileHandler
+trace_logger = logging.getLogger("traces")
+trace_logger.propagate = False
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def _new_id() -> str:
+    return os.urandom(8).hex()
+
+class Span:
+    """Bitta amal (update, DB metodi, API chaqiruvi) vaqti va atributlari"""
+
+    __slots__ = ("name", "trace", "span_id", "parent_id", "start", "end", "attributes")
+
+    def __init__(self, name: str, trace: "Trace", parent_id: Optional[str], attributes: Dict):
+        self.name = name
+        self.trace = trace
+        self.span_id = _new_id()
+        self.parent_id = parent_id
+        self.start = time.time()
+        self.end = None
+        self.attributes = attributes
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": round(self.start, 6),
+            "duration_ms": round(((self.end or time.time()) - self.start) * 1000, 3),
+            "attributes": self.attributes,
+        }
+
+class Trace:
+    """Bitta update uchun spanlar to'plami"""
+
+    __slots__ = ("trace_id", "spans")
+
+    def __init__(self):
+        self.trace_id = _new_id()
+        self.spans = []
+
+@contextmanager
+def start_trace(name: str, **attributes):
+    """Ildiz span; sampling shu yerda hal qilinadi (tanlanmasa - hech narsa yozilmaydi)"""
+    if _listener is None or random.random() >= TRACE_SAMPLE_RATE:
+        yield None
+        return
+
+    trace = Trace()
+    root = Span(name, trace, None, attributes)
+    trace.spans.append(root)
+    token = _current_span.set(root)
+    try:
+        yield root
+    except BaseException as e:
+        root.set_attribute("error", repr(e))
+        raise
+    finally:
+        root.end = time.time()
+        _current_span.reset(token)
+        trace_logger.info(json.dumps({
+            "trace_id": trace.trace_id,
+            "spans": [span.to_dict() for span in trace.spans],
+        }, ensure_ascii=False, default=str))
+
+@contextmanager
+def span(name: str, **attributes):
+    """Joriy trace ichida ichki span (trace bo'lmasa - hech narsa qilmaydi)"""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = Span(name, parent.trace, parent.span_id, attributes)
+    parent.trace.spans.append(child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.set_attribute("error", repr(e))
+        raise
+    finally:
+        child.end = time.time()
+        _current_span.reset(token)
+
+def set_attribute(key: str, value: Any) -> None:
+    """Joriy span va ildiz spanga atribut qo'shish"""
+    current = _current_span.get()
+    if current is not None:
+        current.set_attribute(key, value)
+        current.trace.spans[0].set_attribute(key, value)
+
+def trace_methods(prefix: str):
+    """Klassning barcha ochiq async metodlarini span bilan o'rash (class dekorator)"""
+    def decorate(cls):
+        for attr, func in list(vars(cls).items()):
+            if attr.startswith("_") or not inspect.iscoroutinefunction(func):
+                continue
+            setattr(cls, attr, _traced(f"{prefix}.{attr}", func))
+        return cls
+    return decorate
+
+def _traced(name: str, func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        if _current_span.get() is None:
+            return await func(*args, **kwargs)
+        with span(name):
+            return await func(*args, **kwargs)
+    return wrapper
+
+class TracingMiddleware(BaseMiddleware):
+    """Har bir update uchun ildiz span (dp.update.outer_middleware, birinchi bo'lib)"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        attributes = {"update_type": event.event_type}
+        if user:
+            attributes["user_id"] = user.id
+        if isinstance(event, Update) and event.callback_query:
+            attributes["callback_data"] = event.callback_query.data
+
+        with start_trace(f"update.{event.event_type}", **attributes):
+            return await handler(event, data)
+
+class TracingRequestMiddleware(BaseRequestMiddleware):
+    """Har bir Bot API chaqiruvi uchun span (session.middleware(...))"""
+
+    async def __call__(self, make_request, bot, method):
+        if _current_span.get() is None:
+            return await make_request(bot, method)
+
+        attributes = {}
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is not None:
+            attributes["chat_id"] = chat_id
+        with span(f"api.{type(method).__name__}", **attributes):
+            return await make_request(bot, method)
+
+def setup_tracing() -> None:
+    """Trace eksportini yoqish (TRACE_SAMPLE_RATE > 0 bo'lsa)"""
+    global _listener
+    if _listener is not None or TRACE_SAMPLE_RATE <= 0:
+        return
+
+    # workers.py: har bir worker o'z fayliga yozadi (aylanish jarayonlar orasida xavfsiz emas)
+    path = f"{TRACE_FILE}.{WORKER_INDEX}" if WORKER_INDEX else TRACE_FILE
+    file_handler = logging.handlers.RotatingFileHandler(
+        path, maxBytes=TRACE_MAX_BYTES, backupCount=TRACE_BACKUP_COUNT, encoding="utf-8"
+    )
+    file_handler.setFormatter(logging.Formatter("%(message)s"))
+    log_queue = queue.SimpleQueue()
+    trace_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    trace_logger.setLevel(logging.INFO)
+    _listener = logging.handlers.QueueListener(log_queue, file_handler)
+    _listener.start()
+
+def shutdown_tracing() -> None:
+    """Navbatdagi trace'larni faylga yozib, fon threadni to'xtatish"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+# ===== CLI: eng sekin trace'lar va ularning kritik yo'li =====
+def critical_path(spans: list) -> list:
+    """Ildizdan boshlab har qadamda eng kech tugagan bolani tanlash"""
+    children = {}
+    for s in spans:
+        children.setdefault(s["parent_id"], []).append(s)
+
+    path = []
+    node = next((s for s in spans if s["parent_id"] is None), None)
+    while node is not None:
+        path.append(node)
+        kids = children.get(node["span_id"])
+        node = max(kids, key=lambda s: s["start"] + s["duration_ms"] / 1000) if kids else None
+    return path
+
+def summarize(paths: list, top: int) -> None:
+    traces = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    traces.append(json.loads(line))
+
+    def root_duration(trace):
+        return max((s["duration_ms"] for s in trace["spans"] if s["parent_id"] is None), default=0)
+
+    traces.sort(key=root_duration, reverse=True)
+    print(f"Jami trace'lar: {len(traces)}\n")
+    for trace in traces[:top]:
+        path = critical_path(trace["spans"])
+        print(f"trace {trace['trace_id']}  {root_duration(trace):.1f} ms")
+        for depth, s in enumerate(path):
+            attrs = " ".join(f"{k}={v}" for k, v in s["attributes"].items())
+            print(f"  {'  ' * depth}{s['name']:<40} {s['duration_ms']:>9.1f} ms  {attrs}")
+        print()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Eng sekin trace'larning kritik yo'li")
+    parser.add_argument("files", nargs="*", default=[TRACE_FILE], help="JSONL trace fayllari")
+    parser.add_argument("--top", type=int, default=10, help="nechta trace ko'rsatilsin")
+    args = parser.parse_args()
+    summarize(args.files, args.top)
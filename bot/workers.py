@@ -0,0 +1,253 @@
+"""
+Multi-process rejim: bitta supervisor update'larni qabul qiladi (polling yoki webhook),
+N ta worker jarayon esa ularni qayta ishlaydi.
+
+    python workers.py --workers 4            # getUpdates long polling
+    python workers.py --workers 4 --webhook  # WEBHOOK_URL ga webhook o'rnatiladi
+
+Supervisor update JSON ini faqat dict gacha parse qiladi va user_id bo'yicha
+consistent hash orqali workerni tanlaydi - bitta foydalanuvchining update'lari doim
+bitta workerga, kelgan tartibda tushadi. Model validatsiya va handlerlar workerlarda.
+Workerlar umumiy holatni SQLite orqali bo'lishadi (fayllar, memberships jadvali).
+"""
+import argparse
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import signal
+from typing import Dict, List
+
+from aiohttp import web
+
+from config import (
+    WORKERS, POLL_TIMEOUT, WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_SECRET
+)
+
+logger = logging.getLogger(__name__)
+
+# Worker to'satdan o'chsa qayta ishga tushirish tekshiruvi oralig'i (s)
+MONITOR_INTERVAL = 5
+# To'xtatishda worker navbatini tugatishini kutish (s)
+SHUTDOWN_TIMEOUT = 30
+
+def _hash(value: str) -> int:
+    # hash() har jarayonda tasodifiy - barqaror xesh kerak
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+class HashRing:
+    """Consistent hash: workerlar soni o'zgarsa foydalanuvchilarning ~1/N qismi ko'chadi"""
+
+    def __init__(self, nodes: int, replicas: int = 100):
+        points = sorted((_hash(f"{node}:{replica}"), node)
+                        for node in range(nodes) for replica in range(replicas))
+        self._keys = [key for key, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def get(self, key) -> int:
+        index = bisect.bisect(self._keys, _hash(str(key))) % len(self._keys)
+        return self._nodes[index]
+
+def shard_key(update: Dict) -> int:
+    """Update'dan user_id (foydalanuvchisiz update'lar uchun chat_id)"""
+    for key, payload in update.items():
+        if key == "update_id" or not isinstance(payload, dict):
+            continue
+        user = payload.get("from") or payload.get("user")
+        if user:
+            return user["id"]
+        chat = payload.get("chat")
+        if chat:
+            return chat["id"]
+    return 0
+
+# ===== WORKER =====
+def worker_main(index: int, updates) -> None:
+    """Worker jarayoni (spawn) - main.py dispatcherini navbatdagi update'lar bilan ishlatish"""
+    # Ctrl+C ni supervisor boshqaradi - worker navbatni oxirigacha qayta ishlaydi
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(run_worker(index, updates))
+
+async def run_worker(index: int, updates) -> None:
+    import main as app
+    from aiogram.types import Update
+
+    # Qo'shilish so'rovlarini faqat 0-worker tasdiqlaydi
+    tasks = await app.startup(approve_requests=index == 0)
+    loop = asyncio.get_running_loop()
+    pending = set()
+
+    async def process(raw: Dict):
+        try:
+            update = Update.model_validate(raw, context={"bot": app.bot})
+            await app.dp.feed_update(app.bot, update)
+        except Exception as e:
+            logger.error(f"Worker {index}: update {raw.get('update_id')} xato: {e}")
+
+    logger.info(f"Worker {index} ishga tushdi (pid {os.getpid()})")
+    try:
+        while True:
+            raw = await loop.run_in_executor(None, updates.get)
+            if raw is None:
+                break
+            # Polling kabi: har bir update alohida task (foydalanuvchi tartibi - scheduler da)
+            task = asyncio.create_task(process(raw))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        await asyncio.gather(*pending)
+    finally:
+        await app.shutdown(tasks)
+
+# ===== SUPERVISOR =====
+class Supervisor:
+    """Worker jarayonlari, ularning navbatlari va update marshrutlash"""
+
+    def __init__(self, workers: int):
+        self._ctx = multiprocessing.get_context("spawn")
+        self._queues = [self._ctx.Queue() for _ in range(workers)]
+        self._processes: List = [None] * workers
+        self._ring = HashRing(workers)
+
+    def _start_worker(self, index: int) -> None:
+        process = self._ctx.Process(
+            target=worker_main, args=(index, self._queues[index]), name=f"worker-{index}"
+        )
+        # spawn: bola jarayon workers.py (va config) ni worker_main dan oldin import qiladi,
+        # shuning uchun WORKER_INDEX va WORKERS muhitdan meros bo'lishi kerak - trace/recording
+        # fayllari worker bo'yicha ajratiladi, profil keshi shu worker ulushi bilan to'ldiriladi
+        # (--workers WORKERS dan farq qilishi mumkin)
+        workers = os.environ.get("WORKERS")
+        os.environ["WORKER_INDEX"] = str(index)
+        os.environ["WORKERS"] = str(len(self._processes))
+        try:
+            process.start()
+        finally:
+            os.environ.pop("WORKER_INDEX", None)
+            if workers is None:
+                os.environ.pop("WORKERS", None)
+            else:
+                os.environ["WORKERS"] = workers
+        self._processes[index] = process
+
+    def start(self) -> None:
+        for index in range(len(self._processes)):
+            self._start_worker(index)
+
+    def dispatch(self, update: Dict) -> None:
+        self._queues[self._ring.get(shard_key(update))].put(update)
+
+    async def monitor(self) -> None:
+        """O'chgan workerni qayta ishga tushirish (navbati saqlanadi, sharding o'zgarmaydi)"""
+        while True:
+            await asyncio.sleep(MONITOR_INTERVAL)
+            for index, process in enumerate(self._processes):
+                if not process.is_alive():
+                    logger.error(f"Worker {index} to'xtadi (exit {process.exitcode}), qayta ishga tushirilmoqda")
+                    self._start_worker(index)
+
+    def stop(self) -> None:
+        """Workerlarga to'xtash belgisini yuborish va navbat tugashini kutish"""
+        for queue in self._queues:
+            queue.put(None)
+        for process in self._processes:
+            process.join(SHUTDOWN_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+
+async def poll(supervisor: Supervisor, bot, allowed_updates: List[str]) -> None:
+    """getUpdates long polling - javob faqat json.loads qilinadi, modellar workerlarda"""
+    await bot.delete_webhook()
+    url = bot.session.api.api_url(bot.token, "getUpdates")
+    http = await bot.session.create_session()
+    offset = None
+
+    while True:
+        params = {"timeout": POLL_TIMEOUT, "allowed_updates": json.dumps(allowed_updates)}
+        if offset is not None:
+            params["offset"] = offset
+        try:
+            async with http.get(url, params=params) as response:
+                data = await response.json()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"getUpdates xato: {e}")
+            await asyncio.sleep(1)
+            continue
+
+        if not data.get("ok"):
+            retry_after = data.get("parameters", {}).get("retry_after", 1)
+            logger.error(f"getUpdates: {data.get('description')}, {retry_after}s kutamiz")
+            await asyncio.sleep(retry_after)
+            continue
+
+        for update in data["result"]:
+            offset = update["update_id"] + 1
+            supervisor.dispatch(update)
+
+async def serve_webhook(supervisor: Supervisor, bot, allowed_updates: List[str]) -> None:
+    """Webhook server - update navbatga qo'yilgach darhol 200 qaytariladi"""
+    async def handle(request: web.Request) -> web.Response:
+        if WEBHOOK_SECRET and request.headers.get("X-Telegram-Bot-Api-Secret-Token") != WEBHOOK_SECRET:
+            return web.Response(status=401)
+        supervisor.dispatch(await request.json())
+        return web.Response()
+
+    app = web.Application()
+    app.router.add_post(WEBHOOK_PATH, handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+    await bot.set_webhook(
+        WEBHOOK_URL, secret_token=WEBHOOK_SECRET or None, allowed_updates=allowed_updates
+    )
+    logger.info(f"Webhook: {WEBHOOK_URL} -> {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+async def supervise(workers: int, webhook: bool) -> None:
+    import main as app
+
+    # Migratsiya (va WAL) workerlardan oldin - ular bir vaqtda boshlaganda qulf kutmaydi
+    await app.db.init_db()
+    allowed_updates = app.dp.resolve_used_update_types()
+
+    # systemd stop (SIGTERM) - Ctrl+C kabi toza to'xtatish
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+
+    supervisor = Supervisor(workers)
+    supervisor.start()
+    monitor_task = asyncio.create_task(supervisor.monitor())
+    logger.info(f"Supervisor: {workers} ta worker, {'webhook' if webhook else 'polling'}")
+    try:
+        if webhook:
+            await serve_webhook(supervisor, app.bot, allowed_updates)
+        else:
+            await poll(supervisor, app.bot, allowed_updates)
+    finally:
+        monitor_task.cancel()
+        await loop.run_in_executor(None, supervisor.stop)
+        await app.close_session()
+        if app.recorder:
+            app.recorder.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="User botni bir nechta jarayonda ishga tushirish")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="worker jarayonlar soni")
+    parser.add_argument("--webhook", action="store_true", help="polling o'rniga webhook (WEBHOOK_URL)")
+    args = parser.parse_args()
+
+    if args.webhook and not WEBHOOK_URL:
+        parser.error("--webhook uchun WEBHOOK_URL sozlanishi kerak")
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(supervise(args.workers, args.webhook))
+    except KeyboardInterrupt:
+        pass
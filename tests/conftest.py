@@ -0,0 +1,24 @@
+import asyncio
+import os
+import sys
+
+# config.py .env ni o'qiydi (mavjud muhit o'zgaruvchilari ustun) - testlar
+# haqiqiy tokenlar va ADMIN_ID ga bog'liq bo'lmasin
+os.environ.update({
+    "USER_BOT_TOKEN": "123456:TEST",
+    "ADMIN_BOT_TOKEN": "654321:TEST",
+    "ADMIN_ID": "42",
+    "CALLBACK_SECRET": "test-secret",
+})
+
+# bot/ modullari bir-birini "from config import ..." ko'rinishida import qiladi
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bot"))
+
+async def wait(awaitable, timeout: float = 1):
+    """Slot yoki parvoz yo'qolsa test osilib qolmasin - xato bilan tugasin"""
+    return await asyncio.wait_for(awaitable, timeout)
+
+async def settle():
+    """Navbatdagi callback va tasklarga bir necha sikl iteratsiyasi berish"""
+    for _ in range(5):
+        await asyncio.sleep(0)
@@ -0,0 +1,98 @@
+import base64
+
+import pytest
+
+from download_tokens import (
+    PREFIX, MEDIA_TYPES, MAC_SIZE, _payload, _sign,
+    encode_download_token, decode_download_token, legacy_file_id,
+)
+
+# Telegram callback_data limiti
+CALLBACK_DATA_LIMIT = 64
+MAX_ID = 2 ** 64 - 1
+
+def raw_token(data: str) -> bytes:
+    encoded = data[len(PREFIX):]
+    return base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+
+def make_token(raw: bytes) -> str:
+    return PREFIX + base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+@pytest.mark.parametrize("file_db_id, bot_id", [(1, 1), (12345, 7), (MAX_ID, MAX_ID)])
+@pytest.mark.parametrize("file_type", MEDIA_TYPES)
+def test_round_trip(file_db_id, bot_id, file_type):
+    token = encode_download_token(file_db_id, bot_id, file_type)
+    assert decode_download_token(token) == (file_db_id, bot_id, file_type)
+
+@pytest.mark.parametrize("file_db_id, bot_id", [(1, 1), (MAX_ID, MAX_ID)])
+def test_fits_callback_data_limit(file_db_id, bot_id):
+    token = encode_download_token(file_db_id, bot_id, "document")
+    assert token.startswith(PREFIX)
+    assert len(token.encode()) <= CALLBACK_DATA_LIMIT
+
+def test_unknown_media_type_rejected():
+    with pytest.raises(ValueError, match="media turi"):
+        encode_download_token(1, 1, "sticker")
+
+def test_tampered_mac_rejected():
+    raw = bytearray(raw_token(encode_download_token(5, 3, "video")))
+    raw[-1] ^= 0x01
+    assert decode_download_token(make_token(bytes(raw))) is None
+
+def test_tampered_payload_rejected():
+    # Boshqa fayl ID si, eski MAC bilan
+    raw = bytearray(raw_token(encode_download_token(5, 3, "video")))
+    raw[7] ^= 0x01
+    assert decode_download_token(make_token(bytes(raw))) is None
+
+def test_non_canonical_encoding_rejected():
+    token = encode_download_token(5, 3, "video")
+    alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
+    # Oxirgi belgining ishlatilmaydigan past bitlari - o'sha baytlar, boshqa matn
+    last = alphabet[alphabet.index(token[-1]) | 1]
+    forged = token[:-1] + last
+    assert forged != token
+    assert raw_token(forged) == raw_token(token)
+    assert decode_download_token(forged) is None
+
+def test_out_of_range_media_byte_rejected():
+    payload = _payload.pack(5, 3, len(MEDIA_TYPES))
+    assert decode_download_token(make_token(payload + _sign(payload))) is None
+
+@pytest.mark.parametrize("data", [
+    None,
+    "",
+    PREFIX,
+    "download_5",
+    "upload_" + "A" * 39,
+    PREFIX + "A" * 38,
+    PREFIX + "A" * 40,
+    PREFIX + "!" * 39,
+])
+def test_malformed_rejected(data):
+    assert decode_download_token(data) is None
+
+def test_wrong_length_of_valid_token_rejected():
+    token = encode_download_token(5, 3, "video")
+    assert decode_download_token(token[:-1]) is None
+    assert decode_download_token(token + "A") is None
+    assert len(raw_token(token)) == _payload.size + MAC_SIZE
+
+@pytest.mark.parametrize("data, expected", [
+    ("download_1", 1),
+    ("download_000123", 123),
+    ("download_", None),
+    ("download_-1", None),
+    ("download_1a", None),
+    ("download_ 1", None),
+    ("download_١٢", None),  # unicode raqamlar
+    ("download_²", None),
+    ("upload_1", None),
+    ("", None),
+    (None, None),
+])
+def test_legacy_file_id(data, expected):
+    assert legacy_file_id(data) == expected
+
+def test_legacy_parser_ignores_signed_tokens():
+    assert legacy_file_id(encode_download_token(5, 3, "video")) is None
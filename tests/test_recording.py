@@ -0,0 +1,102 @@
+import pytest
+
+from config import ADMIN_ID
+from recording import scrub, pseudonymize
+
+USER_ID = 1001
+OTHER_ID = 2002
+
+def user(user_id: int = USER_ID, **extra):
+    return {"id": user_id, "is_bot": False, "first_name": "Ali", "last_name": "Valiyev",
+            "username": "ali", "language_code": "uz", **extra}
+
+def private_chat(chat_id: int = USER_ID):
+    return {"id": chat_id, "type": "private", "first_name": "Ali", "username": "ali"}
+
+CHANNEL = {"id": -1001234567890, "type": "channel", "title": "Kanal"}
+
+def test_pseudonym_is_stable_and_hides_id():
+    assert pseudonymize(USER_ID) == pseudonymize(USER_ID)
+    assert pseudonymize(USER_ID) != USER_ID
+    assert pseudonymize(USER_ID) != pseudonymize(OTHER_ID)
+    assert 0 < pseudonymize(USER_ID) < 2 ** 48
+
+def test_private_message_ids_match_and_personal_fields_dropped():
+    update = scrub({"update_id": 1, "message": {
+        "message_id": 5, "date": 0, "from": user(), "chat": private_chat(), "text": "salom",
+    }})
+    message = update["message"]
+    # Foydalanuvchi va uning shaxsiy chati - bitta taxallus
+    assert message["from"]["id"] == message["chat"]["id"] == pseudonymize(USER_ID)
+    assert message["from"] == {"id": pseudonymize(USER_ID), "is_bot": False, "first_name": "user"}
+    assert message["chat"] == {"id": pseudonymize(USER_ID), "type": "private", "first_name": "user"}
+    assert update["update_id"] == 1 and message["message_id"] == 5
+
+def test_join_request_user_chat_id_matches_from():
+    update = scrub({"update_id": 2, "chat_join_request": {
+        "chat": CHANNEL, "from": user(), "user_chat_id": USER_ID, "date": 0,
+        "invite_link": {"invite_link": "https://t.me/+secret", "creator": user(OTHER_ID),
+                        "creates_join_request": True, "is_primary": False, "is_revoked": False},
+    }})
+    request = update["chat_join_request"]
+    assert request["user_chat_id"] == request["from"]["id"] == pseudonymize(USER_ID)
+    # Kanal ID si va nomi foydalanuvchi ma'lumoti emas
+    assert request["chat"] == CHANNEL
+    assert "invite_link" not in request
+
+@pytest.mark.parametrize("update", [
+    {"message": {"from": user(ADMIN_ID), "chat": private_chat(ADMIN_ID), "text": "/stats"}},
+    {"chat_join_request": {"chat": CHANNEL, "from": user(ADMIN_ID), "user_chat_id": ADMIN_ID}},
+    {"callback_query": {"id": "1", "from": user(ADMIN_ID), "data": "download_1"}},
+])
+def test_admin_id_passes_through(update):
+    payload = next(iter(scrub(update).values()))
+    assert payload["from"]["id"] == ADMIN_ID
+    if "chat" in payload and payload["chat"]["type"] == "private":
+        assert payload["chat"]["id"] == ADMIN_ID
+    if "user_chat_id" in payload:
+        assert payload["user_chat_id"] == ADMIN_ID
+
+@pytest.mark.parametrize("field, value", [
+    ("contact", {"phone_number": "+998901234567", "first_name": "Ali", "user_id": USER_ID}),
+    ("location", {"latitude": 41.3, "longitude": 69.2}),
+    ("entities", [{"type": "mention", "offset": 0, "length": 4}]),
+    ("caption_entities", [{"type": "bold", "offset": 0, "length": 1}]),
+])
+def test_personal_fields_dropped(field, value):
+    message = scrub({"message": {"from": user(), "chat": private_chat(), field: value}})["message"]
+    assert field not in message
+    assert "username" not in message["from"] and "last_name" not in message["from"]
+    assert "language_code" not in message["from"] and "username" not in message["chat"]
+
+@pytest.mark.parametrize("field, value, expected", [
+    ("text", "salom dunyo", "x" * 11),
+    ("text", "/start", "/start"),
+    ("text", "/start ref_123", "/start ref_123"),
+    ("caption", "maxfiy", "x" * 6),
+    ("caption", "/help", "/help"),
+    ("text", "", ""),
+])
+def test_text_masked_commands_kept(field, value, expected):
+    message = scrub({"message": {"chat": private_chat(), field: value}})["message"]
+    assert message[field] == expected
+
+@pytest.mark.parametrize("path, payload", [
+    (("forward_origin", "sender_user"), {"type": "user", "date": 0, "sender_user": user(OTHER_ID)}),
+    (("reply_to_message", "from"), {"message_id": 1, "date": 0, "from": user(OTHER_ID)}),
+    (("new_chat_members", 0), [user(OTHER_ID)]),
+])
+def test_nested_users_pseudonymized(path, payload):
+    message = scrub({"message": {"from": user(), "chat": private_chat(), path[0]: payload}})["message"]
+    nested = message[path[0]][path[1]]
+    assert nested == {"id": pseudonymize(OTHER_ID), "is_bot": False, "first_name": "user"}
+
+@pytest.mark.parametrize("key", ["user_id", "user_chat_id", "sender_user_id"])
+def test_user_id_fields_pseudonymized(key):
+    assert scrub({key: USER_ID}) == {key: pseudonymize(USER_ID)}
+
+def test_non_person_ids_kept():
+    group = {"id": -100500, "type": "supergroup", "title": "Guruh"}
+    message = scrub({"message": {"message_id": 7, "from": user(), "chat": group}})["message"]
+    assert message["chat"] == group
+    assert message["message_id"] == 7
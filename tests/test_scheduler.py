@@ -0,0 +1,203 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import settle, wait
+from middlewares import (
+    PriorityLimiter, SchedulerMiddleware,
+    PRIORITY_CALLBACK, PRIORITY_DEFAULT, PRIORITY_START,
+)
+
+pytestmark = pytest.mark.asyncio
+
+def make_update(text: str = "salom", callback: bool = False):
+    """get_update_priority uchun yetarli update"""
+    return SimpleNamespace(
+        callback_query=SimpleNamespace() if callback else None,
+        message=None if callback else SimpleNamespace(text=text),
+    )
+
+def make_data(user_id: int):
+    return {"event_from_user": SimpleNamespace(id=user_id)}
+
+# ===== PriorityLimiter =====
+async def test_release_hands_slot_by_priority_then_fifo():
+    limiter = PriorityLimiter(1)
+    assert await limiter.acquire(PRIORITY_DEFAULT)
+
+    order = []
+
+    async def waiter(name, priority):
+        await limiter.acquire(priority)
+        order.append(name)
+
+    tasks = [
+        asyncio.create_task(waiter("start", PRIORITY_START)),
+        asyncio.create_task(waiter("default-1", PRIORITY_DEFAULT)),
+        asyncio.create_task(waiter("callback", PRIORITY_CALLBACK)),
+        asyncio.create_task(waiter("default-2", PRIORITY_DEFAULT)),
+    ]
+    await settle()
+    assert limiter.queued == 4
+
+    for _ in tasks:
+        limiter.release()
+        await settle()
+        # Slot to'g'ridan-to'g'ri uzatiladi
+        assert limiter.in_flight == 1
+    await wait(asyncio.gather(*tasks))
+
+    assert order == ["callback", "default-1", "default-2", "start"]
+    limiter.release()
+    assert (limiter.in_flight, limiter.queued) == (0, 0)
+
+async def test_timeout_during_handoff_passes_slot_on():
+    limiter = PriorityLimiter(1)
+    assert await limiter.acquire(PRIORITY_DEFAULT)
+    next_waiter = asyncio.create_task(limiter.acquire(PRIORITY_DEFAULT))
+    await settle()
+
+    # timeout=0: wait_for kutuvchini shu iteratsiyada bekor qiladi; release() esa
+    # undan oldin rejalashtirilgan - slot aynan timeout paytida beriladi
+    late = asyncio.create_task(limiter.acquire(PRIORITY_CALLBACK, timeout=0))
+    asyncio.get_running_loop().call_soon(limiter.release)
+
+    assert await wait(late) is False
+    assert await wait(next_waiter) is True
+    assert (limiter.in_flight, limiter.queued) == (1, 0)
+
+    limiter.release()
+    assert (limiter.in_flight, limiter.queued) == (0, 0)
+
+async def test_timeout_during_handoff_without_waiters_frees_slot():
+    limiter = PriorityLimiter(1)
+    assert await limiter.acquire(PRIORITY_DEFAULT)
+
+    late = asyncio.create_task(limiter.acquire(PRIORITY_START, timeout=0))
+    asyncio.get_running_loop().call_soon(limiter.release)
+
+    assert await wait(late) is False
+    assert (limiter.in_flight, limiter.queued) == (0, 0)
+    assert await limiter.acquire(PRIORITY_START, timeout=0)
+
+@pytest.mark.parametrize("cancel_first", [True, False])
+async def test_cancel_during_handoff_keeps_slot(cancel_first):
+    limiter = PriorityLimiter(1)
+    assert await limiter.acquire(PRIORITY_DEFAULT)
+
+    cancelled = asyncio.create_task(limiter.acquire(PRIORITY_CALLBACK))
+    await settle()
+    next_waiter = asyncio.create_task(limiter.acquire(PRIORITY_DEFAULT))
+    await settle()
+
+    def handoff_and_cancel():
+        # Slot berish va bekor qilish bitta callback ichida - ikkala tartibda
+        if cancel_first:
+            cancelled.cancel()
+            limiter.release()
+        else:
+            limiter.release()
+            cancelled.cancel()
+
+    asyncio.get_running_loop().call_soon(handoff_and_cancel)
+    try:
+        got_slot = await wait(cancelled)
+    except asyncio.CancelledError:
+        got_slot = False
+
+    if got_slot:
+        # Slot allaqachon berilgan bo'lsa wait_for uni qaytarishi mumkin - egasi bo'shatadi
+        assert not next_waiter.done()
+        limiter.release()
+    assert await wait(next_waiter) is True
+    assert (limiter.in_flight, limiter.queued) == (1, 0)
+
+async def test_timed_out_waiter_is_skipped():
+    limiter = PriorityLimiter(1)
+    assert await limiter.acquire(PRIORITY_DEFAULT)
+
+    assert await limiter.acquire(PRIORITY_CALLBACK, timeout=0.01) is False
+    assert limiter.queued == 0
+    assert limiter.queued_by_priority() == {}
+
+    limiter.release()
+    assert (limiter.in_flight, limiter.queued) == (0, 0)
+
+# ===== SchedulerMiddleware =====
+async def test_same_user_serialized_other_users_parallel():
+    scheduler = SchedulerMiddleware(max_concurrency=4, max_queue=10, shed_timeout=1)
+    gate = asyncio.Event()
+    running = []
+
+    async def handler(event, data):
+        running.append(data["event_from_user"].id)
+        await gate.wait()
+
+    tasks = [
+        asyncio.create_task(scheduler(handler, make_update(), make_data(user_id)))
+        for user_id in (1, 1, 2)
+    ]
+    await settle()
+    assert sorted(running) == [1, 2]
+    assert scheduler.metrics()['active_users'] == 2
+
+    gate.set()
+    await wait(asyncio.gather(*tasks))
+    assert sorted(running) == [1, 1, 2]
+    assert scheduler.processed == 3
+    assert scheduler._user_locks == {}
+    assert (scheduler.limiter.in_flight, scheduler.limiter.queued) == (0, 0)
+
+async def test_user_lock_cleaned_up_after_shed_and_error():
+    scheduler = SchedulerMiddleware(max_concurrency=1, max_queue=10, shed_timeout=0.01)
+    gate = asyncio.Event()
+
+    async def slow(event, data):
+        await gate.wait()
+
+    async def failing(event, data):
+        raise RuntimeError("handler xatosi")
+
+    first = asyncio.create_task(scheduler(slow, make_update(), make_data(1)))
+    await settle()
+
+    # Shu foydalanuvchining /start i navbatda kutib tashlab yuboriladi
+    assert await scheduler(slow, make_update("/start"), make_data(1)) is None
+    # Boshqa foydalanuvchining /start i global slotni kutib tashlab yuboriladi
+    assert await scheduler(slow, make_update("/start"), make_data(2)) is None
+    assert scheduler.shed == 2
+    assert list(scheduler._user_locks) == [1]
+
+    gate.set()
+    await wait(first)
+    with pytest.raises(RuntimeError):
+        await scheduler(failing, make_update(), make_data(1))
+
+    assert scheduler._user_locks == {}
+    assert (scheduler.limiter.in_flight, scheduler.limiter.queued) == (0, 0)
+
+async def test_cancelled_update_releases_user_lock():
+    scheduler = SchedulerMiddleware(max_concurrency=1, max_queue=10, shed_timeout=1)
+    gate = asyncio.Event()
+
+    async def handler(event, data):
+        await gate.wait()
+
+    holder = asyncio.create_task(scheduler(handler, make_update(), make_data(1)))
+    await settle()
+    # Boshqa foydalanuvchi global slotni, shu foydalanuvchi esa lockni kutadi
+    waiting_slot = asyncio.create_task(scheduler(handler, make_update(), make_data(2)))
+    waiting_lock = asyncio.create_task(scheduler(handler, make_update(), make_data(1)))
+    await settle()
+
+    waiting_slot.cancel()
+    waiting_lock.cancel()
+    await asyncio.gather(waiting_slot, waiting_lock, return_exceptions=True)
+    assert list(scheduler._user_locks) == [1]
+    assert scheduler.limiter.queued == 0
+
+    gate.set()
+    await wait(holder)
+    assert scheduler._user_locks == {}
+    assert (scheduler.limiter.in_flight, scheduler.limiter.queued) == (0, 0)
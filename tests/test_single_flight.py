@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from conftest import settle, wait
+from middlewares import SingleFlightMiddleware
+
+pytestmark = pytest.mark.asyncio
+
+def make_middleware():
+    duplicates = []
+
+    async def on_duplicate(event, result):
+        duplicates.append((event, result))
+
+    middleware = SingleFlightMiddleware(key_func=lambda event: event.get("key"), on_duplicate=on_duplicate)
+    return middleware, duplicates
+
+async def start_flight(middleware, handler, count: int):
+    """Bitta kalitli `count` ta update: birinchisi handlerga, qolganlari kutadi"""
+    tasks = [
+        asyncio.create_task(middleware(handler, {"key": "download_x", "n": n}, {}))
+        for n in range(count)
+    ]
+    await settle()
+    return tasks
+
+async def test_duplicates_share_owner_result():
+    middleware, duplicates = make_middleware()
+    gate = asyncio.Event()
+    calls = []
+
+    async def handler(event, data):
+        calls.append(event["n"])
+        await gate.wait()
+        return "yuborildi"
+
+    owner, *others = await start_flight(middleware, handler, 3)
+    gate.set()
+
+    assert await wait(owner) == "yuborildi"
+    assert await wait(asyncio.gather(*others)) == ["yuborildi", "yuborildi"]
+    assert calls == [0]
+    assert [result for _, result in duplicates] == ["yuborildi", "yuborildi"]
+    assert middleware.coalesced == 2
+    assert middleware._flights == {}
+
+async def test_owner_error_reaches_duplicates_as_none():
+    middleware, duplicates = make_middleware()
+    gate = asyncio.Event()
+
+    async def handler(event, data):
+        await gate.wait()
+        raise RuntimeError("send_video xatosi")
+
+    owner, duplicate = await start_flight(middleware, handler, 2)
+    gate.set()
+
+    with pytest.raises(RuntimeError):
+        await wait(owner)
+    assert await wait(duplicate) is None
+    assert [result for _, result in duplicates] == [None]
+    assert middleware._flights == {}
+
+async def test_owner_cancelled_releases_duplicates():
+    middleware, duplicates = make_middleware()
+
+    async def handler(event, data):
+        await asyncio.Event().wait()
+
+    owner, duplicate = await start_flight(middleware, handler, 2)
+    owner.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await owner
+    # Takroriy update bekor qilinmaydi - on_duplicate None bilan chaqiriladi
+    assert await wait(duplicate) is None
+    assert not duplicate.cancelled()
+    assert [result for _, result in duplicates] == [None]
+    assert middleware._flights == {}
+
+async def test_cancelled_duplicate_does_not_affect_owner():
+    middleware, duplicates = make_middleware()
+    gate = asyncio.Event()
+
+    async def handler(event, data):
+        await gate.wait()
+        return "yuborildi"
+
+    owner, duplicate = await start_flight(middleware, handler, 2)
+    duplicate.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await duplicate
+    assert duplicates == []
+
+    gate.set()
+    assert await wait(owner) == "yuborildi"
+    assert middleware._flights == {}
+
+async def test_new_flight_after_previous_finished():
+    middleware, duplicates = make_middleware()
+    calls = []
+
+    async def handler(event, data):
+        calls.append(event["n"])
+        return len(calls)
+
+    assert await middleware(handler, {"key": "download_x", "n": 0}, {}) == 1
+    assert await middleware(handler, {"key": "download_x", "n": 1}, {}) == 2
+    # Kalitsiz update birlashtirilmaydi
+    assert await middleware(handler, {"n": 2}, {}) == 3
+    assert calls == [0, 1, 2]
+    assert duplicates == []
+    assert middleware.coalesced == 0